@@ -0,0 +1,79 @@
+"""Time block classification on large, list-heavy documents.
+
+Usage: python3 bench/bench_block_classifier.py [--lines N] [--repeat R]
+
+Splits a synthetic document of roughly N lines (mostly long ordered and
+unordered lists) into blocks and times classify_blocks() on it, next to
+the previous regex-per-line classifier for reference.
+"""
+
+import argparse, os, re, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from block_markdown import BlockType, classify_blocks, markdown_to_blocks
+
+
+def regex_block_to_block_type(block):
+    # The classifier as it was before precompiled checks, kept as a baseline.
+    lines = block.split("\n")
+
+    if len(lines) == 1 and re.match(r"#{1,6} .+", block):
+        return BlockType.HEADING
+    if len(lines) >= 3 and re.match(r"```", lines[0]) and re.match(r"```$", lines[-1]):
+        return BlockType.CODE
+    if re.match(r"> ?.*", block):
+        for line in lines:
+            if not re.match(r"> ?.*", line):
+                return BlockType.PARAGRAPH
+        return BlockType.QUOTE
+    if re.match(r"- ", block):
+        for line in lines:
+            if not re.match(r"- ", line):
+                return BlockType.PARAGRAPH
+        return BlockType.UNORDERED_LIST
+    if re.match(r"1. ", block):
+        i = 1
+        for line in lines:
+            if not re.match(rf"{i}\. ", line):
+                return BlockType.PARAGRAPH
+            i += 1
+        return BlockType.ORDERED_LIST
+
+    return BlockType.PARAGRAPH
+
+
+def list_heavy_document(line_count, list_length=500):
+    blocks = []
+    lines = 0
+    while lines < line_count:
+        blocks.append(f"## Section {len(blocks)}")
+        blocks.append("\n".join(f"{i}. ordered item {i}" for i in range(1, list_length + 1)))
+        blocks.append("\n".join(f"- unordered item {i}" for i in range(list_length)))
+        blocks.append("\n".join(f"> quoted line {i}" for i in range(20)))
+        blocks.append("A closing paragraph for the section.")
+        lines += 2 * list_length + 23
+    return "\n\n".join(blocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    blocks = markdown_to_blocks(list_heavy_document(args.lines))
+    line_count = sum(block.count("\n") + 1 for block in blocks)
+    assert classify_blocks(blocks) == [regex_block_to_block_type(block) for block in blocks]
+
+    print(f"{len(blocks):,} blocks, {line_count:,} lines")
+    for name, classify in (
+        ("classify_blocks", lambda: classify_blocks(blocks)),
+        ("regex baseline", lambda: [regex_block_to_block_type(block) for block in blocks]),
+    ):
+        best = min(timeit.repeat(classify, number=1, repeat=args.repeat))
+        print(f"{name:>16}: {best * 1000:8.2f} ms  ({line_count / best / 1e6:.2f} M lines/s)")
+
+
+if __name__ == "__main__":
+    main()
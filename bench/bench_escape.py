@@ -0,0 +1,70 @@
+"""Measure the cost of HTML escaping when rendering text-heavy pages.
+
+Usage: python3 bench/bench_escape.py [--blocks N] [--repeat N]
+
+Parses a large synthetic document once, then times ParentNode.to_html with
+the built-in escaping, with escaping switched off, and with html.escape
+applied to every string, for text that needs no escaping and for text where
+every paragraph contains characters that must be escaped.
+"""
+
+import argparse, html, os, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import htmlnode
+from block_markdown import markdown_to_html_node
+
+CLEAN = (
+    "Long paragraphs of prose with some **bold** words, an _italic_ aside and "
+    "`inline code`, followed by many more plain words that need no escaping at all."
+)
+DIRTY = (
+    "Prose comparing a < b && b > c with \"quoted\" text, some **bold & brave** words, "
+    "`x<y>` in code and a [link](/search?q=a&b=c) to finish the paragraph."
+)
+
+
+def synthetic_document(blocks, paragraph):
+    parts = ["# Synthetic document"]
+    for i in range(blocks):
+        if i % 10 == 0:
+            parts.append(f"## Section {i}")
+        else:
+            parts.append(paragraph)
+    return "\n\n".join(parts)
+
+
+def identity(text):
+    return text
+
+
+def time_render(tree, repeat, escape_html, escape_attribute):
+    originals = htmlnode.escape_html, htmlnode.escape_attribute
+    htmlnode.escape_html, htmlnode.escape_attribute = escape_html, escape_attribute
+    try:
+        return min(timeit.repeat(tree.to_html, number=1, repeat=repeat))
+    finally:
+        htmlnode.escape_html, htmlnode.escape_attribute = originals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'text':<8} {'no escaping':>14} {'fast path':>14} {'html.escape':>14} {'overhead':>9}")
+    for name, paragraph in (("clean", CLEAN), ("dirty", DIRTY)):
+        tree = markdown_to_html_node(synthetic_document(args.blocks, paragraph))
+        baseline = time_render(tree, args.repeat, identity, identity)
+        fast = time_render(tree, args.repeat, htmlnode.escape_html, htmlnode.escape_attribute)
+        naive = time_render(tree, args.repeat, lambda text: html.escape(text, quote=False), html.escape)
+        print(
+            f"{name:<8} {baseline * 1000:11.1f} ms {fast * 1000:11.1f} ms {naive * 1000:11.1f} ms"
+            f" {(fast - baseline) / baseline:+8.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
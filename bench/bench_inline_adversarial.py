@@ -0,0 +1,77 @@
+"""Time inline parsing of the adversarial corpus at growing input sizes.
+
+Usage: python3 bench/bench_inline_adversarial.py [--size N] [--max-ratio R]
+
+Parses every input of the adversarial corpus in src/test_inline_adversarial.py
+at a repeat count of N and 4N with each inline engine and prints the ratio of
+the two timings. Linear work gives a ratio near 4 and quadratic work near 16.
+Exits with status 1 if any ratio reaches R. The unit tests check the same
+inputs by counting scans, which does not depend on machine load.
+"""
+
+import argparse, gc, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from inline_markdown import INLINE_ENGINES, set_inline_engine, text_to_textnodes
+from test_inline_adversarial import ADVERSARIAL_INPUTS
+
+
+def parse_time(text):
+    def parse():
+        try:
+            text_to_textnodes(text)
+        except Exception as error:
+            if str(error) != "A closing delimiter is missing":
+                raise
+
+    # Best of several batches, each long enough to time reliably. Like
+    # timeit, collection is paused so heap size does not skew the timings.
+    gc.disable()
+    try:
+        return best_batch_time(parse)
+    finally:
+        gc.enable()
+
+
+def best_batch_time(parse):
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            parse()
+        elapsed = time.perf_counter() - started
+        if elapsed >= 0.002:
+            break
+        calls *= 2
+    best = elapsed
+    for _ in range(4):
+        started = time.perf_counter()
+        for _ in range(calls):
+            parse()
+        best = min(best, time.perf_counter() - started)
+    return best / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=250)
+    parser.add_argument("--max-ratio", type=float, default=9)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'engine':<12} {'input':<24} {'n':>12} {'4n':>12} {'ratio':>6}")
+    for engine in INLINE_ENGINES:
+        set_inline_engine(engine)
+        for name, build in ADVERSARIAL_INPUTS.items():
+            small = parse_time(build(args.size))
+            large = parse_time(build(4 * args.size))
+            ratio = large / small
+            flag = "" if ratio < args.max_ratio else "  too slow"
+            failed = failed or bool(flag)
+            print(f"{engine:<12} {name:<24} {small * 1e6:>10.1f}us {large * 1e6:>10.1f}us {ratio:>6.2f}{flag}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
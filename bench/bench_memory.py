@@ -0,0 +1,80 @@
+"""Measure the memory held by parsed node trees.
+
+Usage: python3 bench/bench_memory.py [--blocks N]
+
+Builds a large synthetic document, parses it into TextNode lists and an
+HTMLNode tree while tracemalloc is running, and reports the bytes retained
+per node.
+"""
+
+import argparse, gc, os, sys, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from block_markdown import markdown_to_html_node
+from htmlnode import HTMLNode
+from inline_markdown import text_to_textnodes
+
+PARAGRAPH = (
+    "Some **bold** words, an _italic_ aside, `inline code`, a [link](/docs/page) "
+    "and an ![image](/images/figure.png) in one paragraph of plain text."
+)
+
+
+def synthetic_document(blocks):
+    parts = ["# Synthetic document"]
+    for i in range(blocks):
+        if i % 4 == 0:
+            parts.append(f"## Section {i}")
+        elif i % 4 == 1:
+            parts.append("\n".join(f"- item {j} with **bold** text" for j in range(8)))
+        else:
+            parts.append(PARAGRAPH)
+    return "\n\n".join(parts)
+
+
+def count_nodes(node):
+    total = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        total += 1
+        if current.children:
+            stack.extend(current.children)
+    return total
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=20000)
+    args = parser.parse_args()
+
+    markdown = synthetic_document(args.blocks)
+    paragraph_count = args.blocks
+
+    text_nodes, text_bytes = measure(lambda: [text_to_textnodes(PARAGRAPH) for _ in range(paragraph_count)])
+    text_node_count = sum(len(nodes) for nodes in text_nodes)
+    del text_nodes
+
+    tree, tree_bytes = measure(lambda: markdown_to_html_node(markdown))
+    tree_node_count = count_nodes(tree)
+
+    slots = "yes" if not hasattr(HTMLNode(), "__dict__") else "no"
+    print(f"document: {len(markdown):,} bytes, {args.blocks:,} blocks, __slots__: {slots}")
+    print(f"TextNode: {text_node_count:,} nodes, {text_bytes / text_node_count:.1f} bytes/node")
+    print(f"HTMLNode tree: {tree_node_count:,} nodes, {tree_bytes / tree_node_count:.1f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Micro-benchmarks for the parser and renderer hot paths.
+
+Usage:
+    python3 bench/microbench.py run [--output results.json] [--filter TEXT]
+                                    [--compare baseline.json] [--threshold 0.1]
+    python3 bench/microbench.py compare baseline.json results.json [--threshold 0.1]
+
+Every benchmark runs on synthetic input of increasing size and inline
+density, entirely offline. Results are stored as JSON keyed by
+"benchmark/size=N/density=D". compare (or run --compare) exits with status
+1 when any benchmark's best time is slower than the baseline by more than
+the threshold.
+"""
+
+import argparse, json, os, platform, statistics, sys, timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from block_markdown import block_to_block_type, markdown_to_blocks, markdown_to_html_node
+from inline_markdown import (
+    set_inline_engine,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from textnode import TextNode, TextType
+
+FORMAT_VERSION = 1
+SIZES = (100, 1_000, 10_000)
+DENSITIES = ("low", "high")
+
+PLAIN_WORDS = "the quick brown fox jumps over the lazy dog and keeps running "
+MARKUP = (
+    "**bold words** ",
+    "_italic words_ ",
+    "`inline code` ",
+    "[a link](/docs/page) ",
+    "![an image](/images/figure.png) ",
+)
+
+
+def inline_text(words, density):
+    # One markup span every 20 words at low density, every 3 at high.
+    every = 20 if density == "low" else 3
+    plain = PLAIN_WORDS.split()
+    parts = []
+    for i in range(words):
+        if i % every == every - 1:
+            parts.append(MARKUP[(i // every) % len(MARKUP)])
+        else:
+            parts.append(plain[i % len(plain)] + " ")
+    return "".join(parts).strip()
+
+
+def document(blocks, density):
+    parts = ["# Benchmark document"]
+    for i in range(blocks):
+        kind = i % 5
+        if kind == 0:
+            parts.append(f"## Section {i}")
+        elif kind == 1:
+            parts.append("\n".join(f"- {inline_text(8, density)}" for _ in range(5)))
+        elif kind == 2:
+            parts.append("\n".join(f"{j}. {inline_text(8, density)}" for j in range(1, 6)))
+        elif kind == 3:
+            parts.append("> " + inline_text(30, density))
+        else:
+            parts.append(inline_text(60, density))
+    return "\n\n".join(parts)
+
+
+def list_block(lines):
+    return "\n".join(f"{i}. ordered item number {i}" for i in range(1, lines + 1))
+
+
+def benchmarks():
+    # Each entry yields (name, size, density, setup) where setup returns the
+    # zero-argument callable to time.
+    for size in SIZES:
+        for density in DENSITIES:
+            text = inline_text(size, density)
+            node = [TextNode(text, TextType.TEXT)]
+            yield "text_to_textnodes", size, density, lambda text=text: (lambda: text_to_textnodes(text))
+            yield (
+                "text_to_textnodes_single_pass",
+                size,
+                density,
+                lambda text=text: single_pass(text),
+            )
+            yield (
+                "split_nodes_delimiter",
+                size,
+                density,
+                lambda node=node: (lambda: split_nodes_delimiter(node, "**", TextType.BOLD)),
+            )
+            yield "split_nodes_image", size, density, lambda node=node: (lambda: split_nodes_image(node))
+            yield "split_nodes_link", size, density, lambda node=node: (lambda: split_nodes_link(node))
+
+            markdown = document(size // 10, density)
+            yield "markdown_to_html_node", size, density, lambda markdown=markdown: (
+                lambda: markdown_to_html_node(markdown)
+            )
+            tree = markdown_to_html_node(markdown)
+            yield "ParentNode.to_html", size, density, lambda tree=tree: (lambda: tree.to_html())
+
+        blocks = markdown_to_blocks(document(size // 10, "low")) + [list_block(size)]
+        yield "block_to_block_type", size, "-", lambda blocks=blocks: (
+            lambda: [block_to_block_type(block) for block in blocks]
+        )
+
+
+def single_pass(text):
+    def run():
+        set_inline_engine("single-pass")
+        try:
+            return text_to_textnodes(text)
+        finally:
+            set_inline_engine("multi-pass")
+    return run
+
+
+def time_callable(function, repeat, min_time):
+    number = 1
+    while True:
+        elapsed = timeit.timeit(function, number=number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    timings = [t / number for t in timeit.repeat(function, number=number, repeat=repeat)]
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(args):
+    results = {}
+    for name, size, density, setup in benchmarks():
+        key = f"{name}/size={size}/density={density}"
+        if args.filter and args.filter not in key:
+            continue
+        results[key] = time_callable(setup(), args.repeat, args.min_time)
+        print(f"{key:<60} {results[key]['min'] * 1e6:12.1f} us")
+
+    report = {
+        "format": FORMAT_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_stream:
+            json.dump(report, output_stream, indent=2, sort_keys=True)
+            output_stream.write("\n")
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_stream:
+            return compare_reports(json.load(baseline_stream), report, args.threshold)
+    return 0
+
+
+def compare_reports(baseline, current, threshold):
+    if baseline.get("format") != FORMAT_VERSION or current.get("format") != FORMAT_VERSION:
+        print("Result files use an unsupported format version.")
+        return 2
+
+    regressions = 0
+    for key in sorted(current["results"]):
+        if key not in baseline["results"]:
+            print(f"{key:<60} {'new':>12}")
+            continue
+        before = baseline["results"][key]["min"]
+        after = current["results"][key]["min"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key:<60} {before * 1e6:10.1f} -> {after * 1e6:10.1f} us  {change:+7.1%}{flag}")
+
+    if regressions:
+        print(f"{regressions} benchmark(s) regressed by more than {threshold:.0%}.")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--output", help="write results to this JSON file")
+    run_parser.add_argument("--filter", help="only run benchmarks whose key contains this text")
+    run_parser.add_argument("--compare", help="baseline JSON file to compare against")
+    run_parser.add_argument("--threshold", type=float, default=0.10)
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--min-time", type=float, default=0.05, help="seconds per timing sample")
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        return run(args)
+
+    with open(args.baseline) as baseline_stream, open(args.current) as current_stream:
+        return compare_reports(json.load(baseline_stream), json.load(current_stream), args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""End-to-end build benchmark on generated sites.
+
+Usage:
+    python3 bench/scale.py [--pages 1000 10000 100000] [--depth 3]
+                           [--static-files 1000] [--static-size 32768]
+                           [--workdir DIR] [--output results.json] [-- MAIN_ARGS...]
+
+For each page count a synthetic site (content/, static/ and template.html)
+is generated under the work directory and src/main.py is run against it
+three times: a cold build, a no-op rebuild and a rebuild after one page
+changed. Each run reports wall time, pages per second, the peak RSS of the
+build process and the bytes written to docs/ and .build-cache/. Anything
+after "--" is passed through to main.py (for example -j 0 or --fragment-cache).
+"""
+
+import argparse, json, math, os, random, shutil, subprocess, sys, tempfile, time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+MAIN = REPO / "src" / "main.py"
+
+WORDS = (
+    "the old forest road wound past the barrow downs toward a quiet river "
+    "where lanterns glimmered under ancient willows and travellers rested"
+).split()
+
+
+def sentence(rng, words):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def inline_paragraph(rng, images):
+    parts = []
+    for _ in range(rng.randint(3, 6)):
+        parts.append(sentence(rng, rng.randint(8, 16)))
+        roll = rng.random()
+        if roll < 0.3:
+            parts.append(f"Some **{rng.choice(WORDS)}** words.")
+        elif roll < 0.5:
+            parts.append(f"An _{rng.choice(WORDS)}_ aside with `code`.")
+        elif roll < 0.65:
+            parts.append(f"A [link](/section-{rng.randrange(10)}/) here.")
+        elif roll < 0.75 and images:
+            parts.append(f"![figure](/images/image-{rng.randrange(images):05}.png)")
+    return " ".join(parts)
+
+
+def page_markdown(rng, index, images):
+    blocks = [f"# Page {index}", "[< Back Home](/)"]
+    if images:
+        blocks.append(f"![cover](/images/image-{rng.randrange(images):05}.png)")
+    for section in range(rng.randint(2, 5)):
+        blocks.append(f"## Section {section}")
+        for _ in range(rng.randint(1, 4)):
+            kind = rng.random()
+            if kind < 0.5:
+                blocks.append(inline_paragraph(rng, images))
+            elif kind < 0.65:
+                blocks.append("\n".join(f"- {sentence(rng, 6)}" for _ in range(rng.randint(2, 6))))
+            elif kind < 0.8:
+                blocks.append("\n".join(f"{i}. {sentence(rng, 6)}" for i in range(1, rng.randint(3, 7))))
+            elif kind < 0.9:
+                blocks.append("> " + sentence(rng, 20))
+            else:
+                blocks.append("```\n" + "\n".join(sentence(rng, 5) for _ in range(4)) + "\n```")
+    return "\n\n".join(blocks) + "\n"
+
+
+def page_path(index, pages, depth):
+    # Spread pages evenly over depth - 1 levels of section directories.
+    if depth <= 1:
+        return Path(f"page-{index:06}")
+    fanout = max(2, math.ceil(pages ** (1 / depth)))
+    parts = []
+    value = index
+    for _ in range(depth - 1):
+        value //= fanout
+        parts.append(f"section-{value % fanout:03}")
+    return Path(*reversed(parts), f"page-{index:06}")
+
+
+def generate_site(root, pages, depth, static_files, static_size, seed=0):
+    rng = random.Random(seed)
+    content = root / "content"
+    static = root / "static"
+    shutil.copyfile(REPO / "template.html", root / "template.html")
+
+    images = static_files // 2
+    content.mkdir(parents=True)
+    (content / "index.md").write_text(page_markdown(rng, 0, images))
+    for index in range(1, pages):
+        directory = content / page_path(index, pages, depth)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "index.md").write_text(page_markdown(rng, index, images))
+
+    (static / "images").mkdir(parents=True)
+    (static / "index.css").write_text("body { font-family: serif; }\n")
+    for index in range(images):
+        (static / "images" / f"image-{index:05}.png").write_bytes(rng.randbytes(static_size))
+    for index in range(static_files - images):
+        directory = static / "assets" / f"group-{index % 32:02}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"asset-{index:05}.bin").write_bytes(rng.randbytes(static_size))
+
+
+def bytes_written_since(started_ns, *directories):
+    # ctime cannot be preserved by a copy, so it marks every file the build
+    # created or rewrote. Hardlinked files share data with static/.
+    total = 0
+    for directory in directories:
+        for dirpath, _, filenames in os.walk(directory):
+            for name in filenames:
+                stat = os.lstat(os.path.join(dirpath, name))
+                if stat.st_ctime_ns >= started_ns and stat.st_nlink == 1:
+                    total += stat.st_size
+    return total
+
+
+def run_build(root, main_args):
+    started_ns = time.time_ns()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(MAIN), "--root", str(root), *main_args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    stderr = process.stderr.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise RuntimeError(f"build failed with exit code {process.returncode}:\n{stderr.decode()}")
+    return {
+        "seconds": elapsed,
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        "peak_rss_bytes": usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+        "bytes_written": bytes_written_since(started_ns, root / "docs", root / ".build-cache"),
+    }
+
+
+def change_one_page(root, pages, depth):
+    path = root / "content" / page_path(pages // 2, pages, depth) / "index.md"
+    with open(path, "a") as page_stream:
+        page_stream.write(f"\nEdited at {time.time_ns()}.\n")
+
+
+def benchmark(workdir, pages, args):
+    root = workdir / f"site-{pages}"
+    if root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True)
+
+    started = time.perf_counter()
+    generate_site(root, pages, args.depth, args.static_files, args.static_size)
+    print(f"{pages:,} pages: generated in {time.perf_counter() - started:.1f} s")
+
+    results = {}
+    for scenario in ("cold", "no-op", "one-changed"):
+        if scenario == "one-changed":
+            change_one_page(root, pages, args.depth)
+        main_args = ["--clean", *args.main_args] if scenario == "cold" else args.main_args
+        result = run_build(root, main_args)
+        result["pages_per_second"] = pages / result["seconds"]
+        results[scenario] = result
+        print(
+            f"  {scenario:<12} {result['seconds']:9.2f} s  {result['pages_per_second']:10.0f} pages/s"
+            f"  peak RSS {result['peak_rss_bytes'] / 2**20:8.1f} MiB"
+            f"  written {result['bytes_written'] / 2**20:9.1f} MiB"
+        )
+
+    if not args.keep:
+        shutil.rmtree(root)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--depth", type=int, default=3, help="directory levels per page path")
+    parser.add_argument("--static-files", type=int, default=1000)
+    parser.add_argument("--static-size", type=int, default=32768, help="bytes per static file")
+    parser.add_argument("--workdir", help="where sites are generated (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated sites")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("main_args", nargs=argparse.REMAINDER, help="arguments passed to main.py after --")
+    args = parser.parse_args()
+    if args.main_args[:1] == ["--"]:
+        args.main_args = args.main_args[1:]
+
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="site-scale-"))
+    report = {
+        "depth": args.depth,
+        "static_files": args.static_files,
+        "static_size": args.static_size,
+        "main_args": args.main_args,
+        "results": {},
+    }
+    try:
+        for pages in args.pages:
+            report["results"][str(pages)] = benchmark(workdir, pages, args)
+    finally:
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as output_stream:
+            json.dump(report, output_stream, indent=2)
+            output_stream.write("\n")
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import hashlib, os, shutil, stat
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from manifest import hash_file
+
+COPY_STRATEGIES = ("copy", "reflink", "hardlink", "symlink")
+
+# ioctl request number for FICLONE on Linux (btrfs, XFS, bcachefs, ...).
+FICLONE = 0x40049409
+
+
+def scan_files(root, follow_symlinks=True):
+    # The target tree is scanned with follow_symlinks=False, so that a link
+    # left there by the symlink or hardlink strategy is seen as a link.
+    # Like os.walk, symlinks to directories are not descended into.
+    files = {}
+    directories = set()
+    if not os.path.isdir(root):
+        return files, directories
+
+    stack = [(os.fspath(root), "")]
+    while stack:
+        directory, rel_dir = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                rel_path = rel_dir + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    directories.add(rel_path)
+                    stack.append((entry.path, rel_path + "/"))
+                elif entry.is_dir():
+                    continue
+                else:
+                    try:
+                        files[rel_path] = entry.stat(follow_symlinks=follow_symlinks)
+                    except FileNotFoundError:
+                        # A dangling symlink left behind by the symlink strategy.
+                        files[rel_path] = entry.stat(follow_symlinks=False)
+    return files, directories
+
+
+def file_is_current(source_path, source_stat, target_path, target_stat, checksum=False, strategy="copy"):
+    if strategy == "symlink" and stat.S_ISLNK(target_stat.st_mode):
+        return os.readlink(target_path) == os.path.abspath(source_path)
+    if strategy == "hardlink" and os.path.samestat(source_stat, target_stat):
+        return True
+    # Otherwise the target must be a copy of its own, not a link made by an
+    # earlier build with another strategy, which would still reach outside
+    # docs/.
+    if not stat.S_ISREG(target_stat.st_mode) or target_stat.st_nlink != 1:
+        return False
+    if source_stat.st_size != target_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(source_path) == hash_file(target_path)
+    return source_stat.st_mtime_ns == target_stat.st_mtime_ns
+
+
+def reflink_file(source_path, target_path):
+    with open(source_path, "rb") as source_stream, open(target_path, "wb") as target_stream:
+        try:
+            import fcntl
+            fcntl.ioctl(target_stream.fileno(), FICLONE, source_stream.fileno())
+            return
+        except (ImportError, OSError):
+            pass
+
+        # copy_file_range lets the kernel share extents or copy in-kernel
+        # where the filesystem supports it.
+        if not hasattr(os, "copy_file_range"):
+            raise OSError("reflink is not supported on this platform")
+        remaining = os.fstat(source_stream.fileno()).st_size
+        while remaining > 0:
+            written = os.copy_file_range(source_stream.fileno(), target_stream.fileno(), remaining)
+            if written == 0:
+                break
+            remaining -= written
+        if remaining:
+            raise OSError("copy_file_range stopped early")
+
+
+def materialize_file(source_path, target_path, strategy="copy"):
+    # Always replace the target rather than writing into it: it may be a
+    # hardlink to, or a symlink at, the source file.
+    if os.path.lexists(target_path):
+        os.unlink(target_path)
+
+    try:
+        if strategy == "hardlink":
+            os.link(source_path, target_path)
+            return strategy
+        if strategy == "symlink":
+            os.symlink(os.path.abspath(source_path), target_path)
+            return strategy
+        if strategy == "reflink":
+            reflink_file(source_path, target_path)
+            shutil.copystat(source_path, target_path)
+            return strategy
+    except OSError:
+        if os.path.lexists(target_path):
+            os.unlink(target_path)
+
+    shutil.copy2(source_path, target_path)
+    return "copy"
+
+
+def sync_state(source_files, keep, strategy):
+    # Everything a sync depends on apart from the target tree itself.
+    keep_digest = hashlib.sha256("\n".join(sorted(keep)).encode()).hexdigest()
+    return {
+        "strategy": strategy,
+        "keep": keep_digest,
+        "files": {rel_path: [file_stat.st_mtime_ns, file_stat.st_size] for rel_path, file_stat in source_files.items()},
+    }
+
+
+def sync_directory(source, target, checksum=False, keep=(), strategy="copy", workers=None, state=None):
+    # state, if given, is the sync_state() of the last completed sync and is
+    # updated in place. While it still holds and every static file is still
+    # in place, the target tree is not scanned at all.
+    source = Path(source)
+    target = Path(target)
+    source_files, source_dirs = scan_files(source)
+    if state is not None:
+        current = sync_state(source_files, keep, strategy)
+        if (
+            not checksum
+            and current == state
+            and all(os.path.lexists(target / rel_path) for rel_path in source_files if rel_path not in keep)
+        ):
+            print(f"Synced {source} to {target}: unchanged since the last build.")
+            return 0, 0
+        state.clear()
+    target_files, target_dirs = scan_files(target, follow_symlinks=False)
+    removed = 0
+    pending = []
+
+    for rel_path, target_stat in target_files.items():
+        if rel_path in source_files or rel_path in keep:
+            continue
+        print(f"Removing: {target / rel_path}")
+        os.unlink(target / rel_path)
+        removed += 1
+
+    for rel_path, source_stat in source_files.items():
+        # Generated pages win over static files with the same path.
+        if rel_path in keep:
+            continue
+        source_path = source / rel_path
+        target_path = target / rel_path
+        target_stat = target_files.get(rel_path)
+        if target_stat and file_is_current(source_path, source_stat, target_path, target_stat, checksum, strategy):
+            continue
+
+        print(f"Copying: {source_path} to {target_path}")
+        if target_path.is_dir() and not target_path.is_symlink():
+            shutil.rmtree(target_path)
+        os.makedirs(target_path.parent, exist_ok=True)
+        pending.append((source_path, target_path))
+
+    if len(pending) > 1 and workers != 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda paths: materialize_file(*paths, strategy), pending))
+    else:
+        for source_path, target_path in pending:
+            materialize_file(source_path, target_path, strategy)
+    copied = len(pending)
+
+    # Drop directories left empty by removals, deepest first.
+    for rel_dir in sorted(target_dirs - source_dirs, key=len, reverse=True):
+        path = target / rel_dir
+        if path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+
+    if state is not None:
+        state.update(current)
+    print(f"Synced {source} to {target}: {copied} copied, {removed} removed.")
+    return copied, removed
@@ -1,10 +1,15 @@
-import re
+import json, re
 from enum import Enum
 
-from htmlnode import ParentNode
+from htmlnode import ParentNode, RawHTMLNode
 from inline_markdown import text_to_textnodes
 from textnode import text_node_to_html_node, TextNode, TextType
 
+TITLE_PATTERN = re.compile(r"(?<!#)# .+")
+HEADING_PATTERN = re.compile(r"(#{1,6} )(.+)")
+CODE_PATTERN = re.compile(r"```(?:\n)?(.*?)```", re.DOTALL)
+TERM_PATTERN = re.compile(r"[^\W_]{2,}")
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -14,122 +19,302 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
 
 def markdown_to_blocks(markdown):
-    markdown_blocks = [ block.strip() for block in markdown.split('\n\n') if block.strip() ]
+    markdown_blocks = [ block for block in (raw.strip() for raw in markdown.split('\n\n')) if block ]
     return markdown_blocks
 
+def iter_markdown_blocks(lines):
+    # Yields the same blocks as markdown_to_blocks, but from any iterable of
+    # lines (such as an open file), holding only one block at a time.
+    block_lines = []
+    for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if line:
+            block_lines.append(line)
+            continue
+        if block_lines:
+            block = "\n".join(block_lines).strip()
+            block_lines = []
+            if block:
+                yield block
+    if block_lines:
+        block = "\n".join(block_lines).strip()
+        if block:
+            yield block
+
+class DocumentSummary:
+    # What the parser learns about a document on its way through it: the
+    # title, the heading outline as (level, text) pairs, link and image
+    # targets in document order, and a word count. Code, link text and
+    # headings count as words; image alt text does not. Given a terms dict,
+    # it also counts every search term (lowercased words of two or more
+    # letters or digits) in the same text.
+    def __init__(self, title=None, headings=None, links=None, images=None, word_count=0, terms=None):
+        self.title = title
+        self.headings = [] if headings is None else headings
+        self.links = [] if links is None else links
+        self.images = [] if images is None else images
+        self.word_count = word_count
+        self.terms = terms
+
+    def find_title(self, block):
+        # Same rule as extract_title, applied to one block at a time.
+        raw_matches = TITLE_PATTERN.search(block)
+        if raw_matches:
+            self.title = raw_matches.group(0)[2:].strip()
+
+    def require_title(self):
+        if self.title is None:
+            raise ValueError("markdown does not contain a title")
+        return self.title
+
+    def add_text(self, text):
+        self.word_count += len(text.split())
+        if self.terms is not None:
+            self.add_terms(text)
+
+    def add_terms(self, text):
+        terms = self.terms
+        for term in TERM_PATTERN.findall(text.lower()):
+            terms[term] = terms.get(term, 0) + 1
+
+    def add_text_nodes(self, text_nodes):
+        for text_node in text_nodes:
+            if text_node.text_type == TextType.IMAGE:
+                self.images.append(text_node.url)
+                continue
+            if text_node.text_type == TextType.LINK:
+                self.links.append(text_node.url)
+            self.word_count += len(text_node.text.split())
+            if self.terms is not None:
+                self.add_terms(text_node.text)
+
+    def add_heading(self, level, text_nodes):
+        self.headings.append((level, "".join(text_node.text for text_node in text_nodes)))
+        self.add_text_nodes(text_nodes)
+
+    def merge(self, other):
+        if self.title is None:
+            self.title = other.title
+        self.headings.extend(other.headings)
+        self.links.extend(other.links)
+        self.images.extend(other.images)
+        self.word_count += other.word_count
+        if self.terms is not None and other.terms:
+            for term, count in other.terms.items():
+                self.terms[term] = self.terms.get(term, 0) + count
+
+    def to_json(self):
+        return json.dumps([self.title, self.headings, self.links, self.images, self.word_count, self.terms])
+
+    @classmethod
+    def from_json(cls, data):
+        # Summaries stored before terms were collected have five fields.
+        title, headings, links, images, word_count, *terms = json.loads(data)
+        terms = terms[0] if terms else None
+        return cls(title, [tuple(heading) for heading in headings], links, images, word_count, terms)
+
+    def __eq__(self, other):
+        if not isinstance(other, DocumentSummary):
+            return NotImplemented
+        return (
+            self.title == other.title
+            and self.headings == other.headings
+            and self.links == other.links
+            and self.images == other.images
+            and self.word_count == other.word_count
+            and self.terms == other.terms
+        )
+
+    def __repr__(self):
+        return (
+            f"DocumentSummary({self.title!r}, {self.headings}, {self.links}, "
+            f"{self.images}, {self.word_count}, {self.terms})"
+        )
+
 def extract_title(markdown):
-    raw_matches = re.search(r"(?<!#)# .+", markdown)
+    raw_matches = TITLE_PATTERN.search(markdown)
     if not raw_matches:
         raise ValueError("markdown does not contain a title")
     title = raw_matches.group(0)[2:].strip()
     return title
 
 def block_to_block_type(block):
+    # Dispatch on the first character, then make a single pass over the
+    # lines with plain string checks.
     lines = block.split("\n")
+    first = block[:1]
 
-    if len(lines) == 1 and re.match(r"#{1,6} .+", block):
-        return BlockType.HEADING
-    if len(lines) >= 3 and re.match(r"```", lines[0]) and re.match(r"```$", lines[-1]):
-        return BlockType.CODE
-    if re.match(r"> ?.*", block):
+    if first == "#":
+        if len(lines) == 1:
+            level = len(block) - len(block.lstrip("#"))
+            if level <= 6 and block[level:level + 1] == " " and len(block) > level + 1:
+                return BlockType.HEADING
+        return BlockType.PARAGRAPH
+    if first == "`":
+        if len(lines) >= 3 and block.startswith("```") and lines[-1] == "```":
+            return BlockType.CODE
+        return BlockType.PARAGRAPH
+    if first == ">":
         for line in lines:
-            if not re.match(r"> ?.*", line):
+            if not line.startswith(">"):
                 return BlockType.PARAGRAPH
         return BlockType.QUOTE
-    if re.match(r"- ", block):
+    if first == "-":
         for line in lines:
-            if not re.match(r"- ", line):
+            if not line.startswith("- "):
                 return BlockType.PARAGRAPH
         return BlockType.UNORDERED_LIST
-    if re.match(r"1. ", block):
-        i = 1
-        for line in lines:
-            if not re.match(rf"{i}\. ", line):
+    if first == "1":
+        for i, line in enumerate(lines, 1):
+            if not line.startswith(f"{i}. "):
                 return BlockType.PARAGRAPH
-            i += 1
         return BlockType.ORDERED_LIST
 
     return BlockType.PARAGRAPH
 
-def markdown_to_html_node(markdown):
+def classify_blocks(blocks):
+    return [block_to_block_type(block) for block in blocks]
+
+def markdown_to_html_node(markdown, cache=None, base_path="/", summary=None):
+    # With a cache, blocks come back as HTML already resolved against
+    # base_path, so the tree must be rendered with the same base_path.
+    # A summary, if given, is filled in as the blocks are parsed.
     blocks = markdown_to_blocks(markdown)
     child_nodes = []
     for block in blocks:
-        child_nodes.append(block_to_html_node(block))
+        if cache is None:
+            child_nodes.append(block_to_html_node(block, summary))
+        else:
+            child_nodes.append(RawHTMLNode(cached_block_html(block, cache, base_path, summary)))
     return ParentNode("div", child_nodes)
 
-def block_to_html_node(block):
+def parse_document(markdown, cache=None, base_path="/", summary=None):
+    # Returns the node tree together with its DocumentSummary, both from
+    # the same single pass over the source.
+    if summary is None:
+        summary = DocumentSummary()
+    node = markdown_to_html_node(markdown, cache, base_path, summary)
+    return node, summary
+
+def cached_block_html(block, cache, base_path="/", summary=None):
+    # Each fragment is stored with its block's own summary, terms included,
+    # so a hit can still contribute to the document summary without parsing
+    # the block.
+    entry = cache.lookup(block, base_path, summary is not None)
+    if entry is not None:
+        html, block_summary = entry
+        if summary is None:
+            return html
+        block_summary = DocumentSummary.from_json(block_summary)
+        if summary.terms is None or block_summary.terms is not None:
+            summary.merge(block_summary)
+            return html
+    block_summary = DocumentSummary(terms={})
+    html = block_to_html_node(block, block_summary).to_html(base_path)
+    cache.put(block, html, base_path, block_summary.to_json())
+    if summary is not None:
+        summary.merge(block_summary)
+    return html
+
+def iter_markdown_html(blocks, cache=None, base_path="/", summary=None):
+    # Streaming counterpart of markdown_to_html_node(...).iter_html(): each
+    # block is parsed, rendered and released before the next is pulled. The
+    # summary is up to date with a block by the time its HTML is yielded.
+    empty = True
+    for block in blocks:
+        if empty:
+            empty = False
+            yield "<div>"
+        if cache is None:
+            yield from block_to_html_node(block, summary).iter_html(base_path)
+        else:
+            yield cached_block_html(block, cache, base_path, summary)
+    if empty:
+        raise ValueError("invalid ParentNode: children are required.")
+    yield "</div>"
+
+def block_to_html_node(block, summary=None):
+    if summary is not None and summary.title is None:
+        summary.find_title(block)
     block_type = block_to_block_type(block)
     match block_type:
         case BlockType.PARAGRAPH:
-            return paragraph_to_html_node(block)
+            return paragraph_to_html_node(block, summary)
         case BlockType.HEADING:
-            return heading_to_html_node(block)
+            return heading_to_html_node(block, summary)
         case BlockType.CODE:
-            return code_to_html_node(block)
+            return code_to_html_node(block, summary)
         case BlockType.QUOTE:
-            return quote_to_html_node(block)
+            return quote_to_html_node(block, summary)
         case BlockType.UNORDERED_LIST:
-            return unordered_list_to_html_nodes(block)
+            return unordered_list_to_html_nodes(block, summary)
         case BlockType.ORDERED_LIST:
-            return ordered_list_to_html_nodes(block)
+            return ordered_list_to_html_nodes(block, summary)
     raise ValueError('invalid block type')
 
-def text_to_children(text):
+def text_to_children(text, summary=None):
     text_nodes = text_to_textnodes(text)
+    if summary is not None:
+        summary.add_text_nodes(text_nodes)
     children = []
     for text_node in text_nodes:
         children.append(text_node_to_html_node(text_node))
     return children
 
-def paragraph_to_html_node(block):
+def paragraph_to_html_node(block, summary=None):
     raw_lines = block.split("\n")
     paragraph = " ".join(raw_lines)
-    children = text_to_children(paragraph)
+    children = text_to_children(paragraph, summary)
     return ParentNode("p", children)
 
-def heading_to_html_node(block):
-    match_group = re.search(r"(#{1,6} )(.+)", block)
+def heading_to_html_node(block, summary=None):
+    match_group = HEADING_PATTERN.search(block)
     heading_level = len(match_group.group(1)) - 1
-    heading = text_to_children(match_group.group(2))
+    text_nodes = text_to_textnodes(match_group.group(2))
+    if summary is not None:
+        summary.add_heading(heading_level, text_nodes)
+    heading = [text_node_to_html_node(text_node) for text_node in text_nodes]
     return ParentNode(f'h{heading_level}', heading)
 
-def code_to_html_node(block):
-    match_group = re.search(r"```(?:\n)?(.*?)```", block, re.DOTALL)
+def code_to_html_node(block, summary=None):
+    match_group = CODE_PATTERN.search(block)
     text = match_group.group(1)
+    if summary is not None:
+        summary.add_text(text)
     raw_text_node = TextNode(text, TextType.TEXT)
     child = text_node_to_html_node(raw_text_node)
     code = ParentNode("code", [child])
     return ParentNode('pre', [code])
 
-def quote_to_html_node(block):
+def quote_to_html_node(block, summary=None):
     raw_lines = block.split("\n")
     new_lines = []
     for raw_line in raw_lines:
         text = raw_line.removeprefix(">").strip()
         new_lines.append(text)
     content = " ".join(new_lines)
-    children = text_to_children(content)
+    children = text_to_children(content, summary)
     return ParentNode("blockquote", children)
 
-def unordered_list_to_html_nodes(block):
+def unordered_list_to_html_nodes(block, summary=None):
     raw_lines = block.split("\n")
     list_nodes = []
     for raw_line in raw_lines:
         text = raw_line.removeprefix("-").strip()
-        children = text_to_children(text)
+        children = text_to_children(text, summary)
         list_nodes.append(ParentNode("li", children))
 
     return ParentNode("ul", list_nodes)
 
 
-def ordered_list_to_html_nodes(block):
+def ordered_list_to_html_nodes(block, summary=None):
     raw_lines = block.split("\n")
     list_nodes = []
     for raw_line in raw_lines:
         parts = raw_line.split(". ", 1)
         text = parts[1]
-        children = text_to_children(text)
+        children = text_to_children(text, summary)
         list_nodes.append(ParentNode("li", children))
 
     return ParentNode("ol", list_nodes)
@@ -0,0 +1,134 @@
+import hashlib, os, sqlite3, time
+from pathlib import Path
+
+from inline_markdown import get_inline_engine
+from manifest import BUILDER_VERSION
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def render_fingerprint(base_path="/"):
+    # Everything besides the block text that changes a block's HTML.
+    return f"{BUILDER_VERSION}\0{get_inline_engine()}\0{base_path}"
+
+
+class FragmentCache:
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Latest (hits, misses) reported by each worker process.
+        self.workers = {}
+        self.used = set()
+        # Bytes stored, known after the first flush and then kept up to
+        # date by put() and evict(), so that flush() can enforce max_bytes
+        # without summing the table every time.
+        self.total = None
+        self.connection = None
+
+    def connect(self):
+        if self.connection is None:
+            os.makedirs(self.path.parent, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS fragments ("
+                "key TEXT PRIMARY KEY, html TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used INTEGER NOT NULL, summary TEXT)"
+            )
+            # Caches written before block summaries were stored gain the
+            # column in place; their rows count as misses for summaries.
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(fragments)")]
+            if "summary" not in columns:
+                self.connection.execute("ALTER TABLE fragments ADD COLUMN summary TEXT")
+        return self.connection
+
+    def key(self, block, base_path="/"):
+        return hashlib.sha256(f"{render_fingerprint(base_path)}\0{block}".encode()).hexdigest()
+
+    def get(self, block, base_path="/"):
+        entry = self.lookup(block, base_path)
+        return None if entry is None else entry[0]
+
+    def lookup(self, block, base_path="/", need_summary=False):
+        # Returns (html, summary), where summary is the block's
+        # DocumentSummary as JSON, or None if it was stored without one.
+        key = self.key(block, base_path)
+        row = self.connect().execute("SELECT html, summary FROM fragments WHERE key = ?", (key,)).fetchone()
+        if row is None or (need_summary and row[1] is None):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.used.add(key)
+        return row
+
+    def put(self, block, html, base_path="/", summary=None):
+        size = len(html.encode()) + len(summary or "")
+        self.connect().execute(
+            "INSERT OR REPLACE INTO fragments (key, html, size, last_used, summary) VALUES (?, ?, ?, ?, ?)",
+            (self.key(block, base_path), html, size, time.time_ns(), summary),
+        )
+        if self.total is not None:
+            # Replacing a row overcounts, which at worst evicts early; evict()
+            # recounts.
+            self.total += size
+
+    def flush(self):
+        if self.connection is None:
+            return
+        if self.used:
+            # Hits only bump their timestamp here, in one batch per flush.
+            now = time.time_ns()
+            self.connection.executemany(
+                "UPDATE fragments SET last_used = ? WHERE key = ?",
+                [(now, key) for key in self.used],
+            )
+            self.used.clear()
+        self.connection.commit()
+        # Called after every page, by the builder and by each worker, or
+        # after every writer batch in pipeline mode, so the bound holds
+        # during long builds and watch sessions too.
+        if self.total is None:
+            self.total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM fragments").fetchone()[0]
+        if self.total > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        connection = self.connect()
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM fragments").fetchone()[0]
+        self.total = total
+        if total <= self.max_bytes:
+            return 0
+
+        stale = []
+        for key, size in connection.execute("SELECT key, size FROM fragments ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM fragments WHERE key = ?", stale)
+        connection.commit()
+        self.total = total
+        return len(stale)
+
+    def merge_stats(self, worker, hits, misses):
+        self.workers[worker] = (hits, misses)
+
+    def stats(self):
+        # Hits and misses include those reported by worker processes.
+        count, size = self.connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM fragments"
+        ).fetchone()
+        hits = self.hits + sum(worker[0] for worker in self.workers.values())
+        misses = self.misses + sum(worker[1] for worker in self.workers.values())
+        return {"hits": hits, "misses": misses, "entries": count, "bytes": size}
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.flush()
+        self.evict()
+        self.connection.close()
+        self.connection = None
@@ -0,0 +1,130 @@
+import json, os
+from pathlib import Path
+
+FENCE = "---"
+# A header longer than this is not front matter, just a page that happens
+# to start with a rule; the limit keeps the metadata reader from scanning
+# whole bodies.
+MAX_HEADER_LINES = 256
+LIST_FIELDS = frozenset(("tags",))
+# Bump whenever parsing changes, so that stored metadata is read again.
+METADATA_FORMAT = 2
+
+
+def parse_value(key, value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if key not in LIST_FIELDS:
+        return value
+    if value.startswith("[") and value.endswith("]"):
+        value = value[1:-1]
+    return [item.strip().strip("\"'") for item in value.split(",") if item.strip()]
+
+
+def parse_fields(lines):
+    metadata = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        key = key.strip().lower()
+        metadata[key] = parse_value(key, value)
+    return metadata
+
+
+def split_header(lines):
+    # Consumes the front matter from an iterator of lines and returns
+    # (metadata, header_lines). metadata is None when the source has no
+    # front matter, and header_lines then holds body lines already taken
+    # from the iterator.
+    first = next(lines, None)
+    if first is None:
+        return None, []
+    header = [first]
+    if first.rstrip("\r\n") != FENCE:
+        return None, header
+    for line in lines:
+        header.append(line)
+        if line.rstrip("\r\n") == FENCE:
+            return parse_fields(header[1:-1]), header
+        if len(header) > MAX_HEADER_LINES:
+            break
+    return None, header
+
+
+def read_front_matter(path):
+    # Lines are decoded one at a time, so nothing past the closing fence is
+    # decoded, even when the body is large.
+    with open(path, "rb") as source_stream:
+        metadata, _ = split_header(line.decode() for line in source_stream)
+    return {} if metadata is None else metadata
+
+
+def skip_front_matter(lines):
+    lines = iter(lines)
+    metadata, header = split_header(lines)
+    if metadata is None:
+        yield from header
+    yield from lines
+
+
+def strip_front_matter(text):
+    if not text.startswith(FENCE):
+        return text
+    return "".join(skip_front_matter(text.splitlines(keepends=True)))
+
+
+class MetadataIndex:
+    # Front matter of every page, stored between builds and re-read only for
+    # files whose mtime or size moved.
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        try:
+            with open(self.path) as index_stream:
+                data = json.load(index_stream)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(data, dict) or data.get("format") != METADATA_FORMAT:
+            return False
+        self.entries = data["entries"]
+        return True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(self.path.parent, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w") as index_stream:
+            json.dump({"format": METADATA_FORMAT, "entries": self.entries}, index_stream, sort_keys=True)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    def get(self, path, key):
+        stat = os.stat(path)
+        cached = self.entries.get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            self.hits += 1
+            return cached[2]
+
+        self.misses += 1
+        metadata = read_front_matter(path)
+        self.entries[key] = [stat.st_mtime_ns, stat.st_size, metadata]
+        self.dirty = True
+        return metadata
+
+    def prune(self, live_keys):
+        live_keys = set(live_keys)
+        stale = [key for key in self.entries if key not in live_keys]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self.dirty = True
+        return stale
@@ -1,104 +1,198 @@
+import sys
+
+
+def escape_html(text):
+    # Most text contains none of these characters, and the membership tests
+    # let it through without building a new string. Chained replace() beats
+    # a str.translate() table here: translate maps one character at a time
+    # through a dict, while each replace() is a single C-level scan.
+    if "&" in text or "<" in text or ">" in text:
+        return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return text
+
+
+URL_PROPS = frozenset(("href", "src"))
+
+
+def resolve_url(url, base_path):
+    # Site-root URLs are served from under base_path; everything else,
+    # including protocol-relative "//host" URLs, is left alone.
+    if base_path != "/" and url.startswith("/") and not url.startswith("//"):
+        return base_path + url[1:]
+    return url
+
+
+def escape_attribute(value):
+    if "&" in value or "<" in value or ">" in value or '"' in value:
+        return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+    return value
+
+
 class HTMLNode:
+    # _hash caches the structural hash once it is first needed; a node must
+    # not be mutated after that.
+    __slots__ = ("tag", "value", "children", "props", "_hash")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        # Tags come from a tiny vocabulary; interning lets every node share
+        # one string object per tag name.
+        self.tag = sys.intern(tag) if type(tag) is str else tag
         self.value = value
         self.children = children
         self.props = props
+        self._hash = None
 
-    def to_html(self):
+    # base_path is the URL prefix the site is served from; root-relative
+    # href and src values are resolved against it as they are rendered.
+    def to_html(self, base_path="/"):
         raise NotImplementedError
 
-    def props_to_html(self):
+    def iter_html(self, base_path="/"):
+        yield self.to_html(base_path)
+
+    def write_html(self, stream, base_path="/"):
+        stream.writelines(self.iter_html(base_path))
+
+    def props_to_html(self, base_path="/"):
         props_html = ""
         if self.props:
             for key, value in self.props.items():
-                props_html += f' {key}="{value}"'
+                if key in URL_PROPS:
+                    value = resolve_url(value, base_path)
+                props_html += f' {key}="{escape_attribute(value)}"'
         return props_html
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
-    
+
+    def __hash__(self):
+        # Hashes the node class, tag, value, props and children, like
+        # __eq__: a text leaf and a raw HTML node with the same value render
+        # differently, so they must not match. Children
+        # are hashed first from an explicit stack, so every node in the tree
+        # computes its hash exactly once and deep trees do not recurse.
+        if self._hash is not None:
+            return self._hash
+        stack = [(self, False)]
+        while stack:
+            node, children_hashed = stack.pop()
+            if node._hash is not None:
+                continue
+            if node.children and not children_hashed:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children)
+                continue
+            node._hash = hash((
+                type(node),
+                node.tag,
+                node.value,
+                None if node.props is None else frozenset(node.props.items()),
+                None if node.children is None else tuple(child._hash for child in node.children),
+            ))
+        return self._hash
+
     def __eq__(self, other):
-        if (
-            self.tag == other.tag
-            and self.value == other.value
-            and self.props == other.props
-        ):
-            if self.children is None and other.children is None:
-                return True
-            
-            if self.children is None or other.children is None:
+        # Identical nodes match at once, and different hashes
+        # rule out a match without walking either tree. Equal hashes are
+        # confirmed field by field, from an explicit stack.
+        if self is other:
+            return True
+        if not isinstance(other, HTMLNode):
+            return NotImplemented
+        stack = [(self, other)]
+        while stack:
+            node, other_node = stack.pop()
+            if node is other_node:
+                continue
+            if hash(node) != hash(other_node):
                 return False
-
-            if self.children and other.children:
-                if len(self.children) != len(other.children):
+            if (
+                type(node) is not type(other_node)
+                or node.tag != other_node.tag
+                or node.value != other_node.value
+                or node.props != other_node.props
+            ):
+                return False
+            if node.children is None or other_node.children is None:
+                if node.children is not other_node.children:
                     return False
-                
-                for i, child in enumerate(self.children):
-                    if not child == other.children[i]:
-                        return False
-                    
+                continue
+            if len(node.children) != len(other_node.children):
+                return False
+            stack.extend(zip(node.children, other_node.children))
         return True
 
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
-    def to_html(self):
+    def to_html(self, base_path="/"):
         if self.value is None:
             raise ValueError
 
         if self.tag is None:
-            return self.value
+            return escape_html(self.value)
 
         else:
-            return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            return f"<{self.tag}{self.props_to_html(base_path)}>{escape_html(self.value)}</{self.tag}>"
 
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 
+class RawHTMLNode(HTMLNode):
+    # Holds HTML that is already escaped and resolved, such as a cached
+    # rendered block; it is written out verbatim.
+    __slots__ = ()
+
+    def __init__(self, html):
+        super().__init__(None, html, None, None)
+
+    def to_html(self, base_path="/"):
+        return self.value
+
+    def __repr__(self):
+        return f"RawHTMLNode({self.value})"
+
+
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def to_html(self, base_path="/"):
+        return "".join(self.iter_html(base_path))
+
+    def open_tag(self, base_path="/"):
         if self.tag is None:
             raise ValueError("invalid HTML: a tag is required.")
 
         if not self.children:
             raise ValueError("invalid ParentNode: children are required.")
 
-        children_nodes = ""
-        for child in self.children:
-            children_nodes += child.to_html()
-
-        return f"<{self.tag}{self.props_to_html()}>{children_nodes}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html(base_path)}>"
+
+    def iter_html(self, base_path="/"):
+        # Walk the tree with an explicit stack so deep documents neither
+        # recurse nor build intermediate strings per level.
+        yield self.open_tag(base_path)
+        stack = [(self, iter(self.children))]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                yield f"</{node.tag}>"
+            elif isinstance(child, ParentNode):
+                yield child.open_tag(base_path)
+                stack.append((child, iter(child.children)))
+            else:
+                yield from child.iter_html(base_path)
 
     def __repr__(self):
         return f"ParentNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
-    
-    def __eq__(self, other):
-        if self.tag != other.tag:
-            return False
-        
-        if self.props != other.props:
-            return False
-    
-        if self.children is None and other.children is None:
-            return True
-    
-        if self.children is None or other.children is None:
-            return False
-
-        if self.children and other.children:
-            if len(self.children) != len(other.children):
-                return False
-            for i, child in enumerate(self.children):
-                if not child == other.children[i]:
-                    return False
-                
-
-        return True
\ No newline at end of file
@@ -1,8 +1,124 @@
 import re
+from functools import lru_cache
 from textnode import TextNode, TextType
 
+INLINE_ENGINES = ("multi-pass", "single-pass")
+_inline_engine = "multi-pass"
+_inline_cache = None
+# Latest (hits, misses, currsize) reported by each worker process.
+_worker_cache_info = {}
+
+INLINE_OPENER = re.compile(r"`|\*\*?|__?|!\[|\[")
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# Links not preceded by "!", for the multi-pass link pass which runs after
+# images have already been split out.
+BARE_LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+DELIMITER_TYPES = {
+    "`": TextType.CODE,
+    "**": TextType.BOLD,
+    "__": TextType.BOLD,
+    "*": TextType.ITALIC,
+    "_": TextType.ITALIC,
+}
+
+
+def set_inline_engine(name):
+    global _inline_engine
+    if name not in INLINE_ENGINES:
+        raise ValueError(f"unknown inline engine: {name}")
+    _inline_engine = name
+
+
+def get_inline_engine():
+    return _inline_engine
+
+
+def enable_inline_cache(maxsize=4096):
+    global _inline_cache
+    _inline_cache = lru_cache(maxsize=maxsize)(_parse_inline)
+    _worker_cache_info.clear()
+
+
+def disable_inline_cache():
+    global _inline_cache
+    _inline_cache = None
+    _worker_cache_info.clear()
+
+
+def merge_inline_cache_info(worker, hits, misses, currsize):
+    _worker_cache_info[worker] = (hits, misses, currsize)
+
+
+def inline_cache_info():
+    # Totals for this process and every worker that has reported; each
+    # worker has its own cache, so currsize adds up their entries.
+    if _inline_cache is None:
+        return None
+    info = _inline_cache.cache_info()
+    for hits, misses, currsize in _worker_cache_info.values():
+        info = info._replace(hits=info.hits + hits, misses=info.misses + misses, currsize=info.currsize + currsize)
+    return info
+
+
+def _parse_inline(engine, text):
+    if engine == "single-pass":
+        return tuple(tokenize_inline(text))
+    return tuple(text_to_textnodes_multi_pass(text))
+
 
 def text_to_textnodes(text):
+    if _inline_cache is not None:
+        # Cached results are shared between callers, so hand out copies.
+        return [TextNode(node.text, node.text_type, node.url) for node in _inline_cache(_inline_engine, text)]
+    if _inline_engine == "single-pass":
+        return tokenize_inline(text)
+    return text_to_textnodes_multi_pass(text)
+
+
+def tokenize_inline(text):
+    # Scans the text once, left to right. At each opener the delimiter,
+    # image or link starting there is consumed whole and its contents are
+    # not parsed further, matching the multi-pass engine on
+    # non-overlapping markup.
+    nodes = []
+    text_start = 0
+    position = 0
+    while True:
+        match = INLINE_OPENER.search(text, position)
+        if match is None:
+            break
+        start = match.start()
+        token = match.group()
+
+        if token in DELIMITER_TYPES:
+            end = text.find(token, match.end())
+            if end == -1:
+                raise Exception("A closing delimiter is missing")
+            if start > text_start:
+                nodes.append(TextNode(text[text_start:start], TextType.TEXT))
+            if end > match.end():
+                nodes.append(TextNode(text[match.end():end], DELIMITER_TYPES[token]))
+            position = text_start = end + len(token)
+            continue
+
+        pattern = IMAGE_PATTERN if token == "![" else LINK_PATTERN
+        span = pattern.match(text, start)
+        if span is None:
+            position = match.end()
+            continue
+        if start > text_start:
+            nodes.append(TextNode(text[text_start:start], TextType.TEXT))
+        text_type = TextType.IMAGE if token == "![" else TextType.LINK
+        nodes.append(TextNode(span.group(1), text_type, span.group(2)))
+        position = text_start = span.end()
+
+    if text_start < len(text):
+        nodes.append(TextNode(text[text_start:], TextType.TEXT))
+    return nodes
+
+
+def text_to_textnodes_multi_pass(text):
     nodes = [TextNode(text, TextType.TEXT)]
     transformers = [
         lambda ns: split_nodes_delimiter(ns, '`', TextType.CODE),
@@ -36,15 +152,12 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
         if len(parts) % 2 == 0:
             raise Exception("A closing delimiter is missing")
         
+        # split() consumed every delimiter, so no part needs splitting again.
         for i, part in enumerate(parts):
             if not part:
                 continue
             if i % 2 == 0:
-                if delimiter in part:
-                    inner_nodes = split_nodes_delimiter([TextNode(part, TextType.TEXT)], delimiter, text_type)
-                    new_nodes.extend(inner_nodes)
-                else:
-                    new_nodes.append(TextNode(part, TextType.TEXT))
+                new_nodes.append(TextNode(part, TextType.TEXT))
             else:
                 new_nodes.append(TextNode(part, text_type))
 
@@ -52,52 +165,39 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
 
 def split_nodes_image(old_nodes):
-    node_list = []
-    for old_node in old_nodes:
-        if old_node.text_type is not TextType.TEXT:
-            node_list.append(old_node)
-            continue
-        split_nodes = []
-        sections = re.split(r"(!\[[^\[\]]*\]\([^\(\)]*\))", old_node.text)
-        for i in range(len(sections)):
-            if re.search(r"!\[[^\[\]]*\]\([^\(\)]*\)", sections[i]):
-                images = extract_markdown_images(sections[i])
-                if images:
-                    for alt_text, url in images:
-                        split_nodes.append(TextNode(alt_text, TextType.IMAGE, url))
-            elif sections[i]:
-                split_nodes.append(TextNode(sections[i], TextType.TEXT))
-        node_list.extend(split_nodes)
-
-    return node_list
+    return split_nodes_pattern(old_nodes, IMAGE_PATTERN, TextType.IMAGE)
 
 
 def split_nodes_link(old_nodes):
+    return split_nodes_pattern(old_nodes, BARE_LINK_PATTERN, TextType.LINK)
+
+
+def split_nodes_pattern(old_nodes, pattern, text_type):
+    # One scan per text node: the negated character classes stop every match
+    # attempt at the next bracket or parenthesis, so the scan stays linear.
     node_list = []
     for old_node in old_nodes:
         if old_node.text_type is not TextType.TEXT:
             node_list.append(old_node)
             continue
-        split_nodes = []
-        sections = re.split(r"((?<!!)\[[^\[\]]*\]\([^\(\)]*\))", old_node.text)
-        for i in range(len(sections)):
-            if re.search(r"(?<!!)\[[^\[\]]*\]\([^\(\)]*\)", sections[i]):
-                links = extract_markdown_links(sections[i])
-                if links:
-                    for anchor_text, url in links:
-                        split_nodes.append(TextNode(anchor_text, TextType.LINK, url))
-            elif sections[i]:
-                split_nodes.append(TextNode(sections[i], TextType.TEXT))
-        node_list.extend(split_nodes)
+        text = old_node.text
+        text_start = 0
+        for match in pattern.finditer(text):
+            if match.start() > text_start:
+                node_list.append(TextNode(text[text_start:match.start()], TextType.TEXT))
+            node_list.append(TextNode(match.group(1), text_type, match.group(2)))
+            text_start = match.end()
+        if text_start < len(text):
+            node_list.append(TextNode(text[text_start:], TextType.TEXT))
 
     return node_list
 
 
 def extract_markdown_images(text):
-    image_links = re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    image_links = IMAGE_PATTERN.findall(text)
     return image_links
 
 
 def extract_markdown_links(text):
-    image_links = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    image_links = BARE_LINK_PATTERN.findall(text)
     return image_links
@@ -0,0 +1,112 @@
+import re
+
+from htmlnode import LeafNode, ParentNode
+
+DEFAULT_PER_PAGE = 10
+SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+
+
+def slugify(text):
+    return SLUG_PATTERN.sub("-", text.lower()).strip("-")
+
+
+def section_title(section):
+    return section.rsplit("/", 1)[-1].replace("-", " ").replace("_", " ").title()
+
+
+def page_url(key):
+    # Every page is written to the index.html of its source's directory.
+    parent = key.rsplit("/", 1)[0] if "/" in key else ""
+    return f"/{parent}/" if parent else "/"
+
+
+def listing_entry(key, metadata):
+    # Draft pages are built but left out of listings.
+    if str(metadata.get("draft", "")).lower() in ("true", "yes"):
+        return None
+    tags = metadata.get("tags", [])
+    if isinstance(tags, str):
+        tags = [tags]
+    url = page_url(key)
+    return {
+        "key": key,
+        "url": url,
+        "title": metadata.get("title") or url.rstrip("/").rsplit("/", 1)[-1],
+        "date": metadata.get("date", ""),
+        "tags": tags,
+        "description": metadata.get("description", ""),
+    }
+
+
+def sort_entries(entries):
+    # Newest first; undated pages go last, ties in path order.
+    entries = sorted(entries, key=lambda entry: entry["key"])
+    return sorted(entries, key=lambda entry: entry["date"], reverse=True)
+
+
+def paginate(entries, per_page):
+    if not entries:
+        return [[]]
+    return [entries[i:i + per_page] for i in range(0, len(entries), per_page)]
+
+
+def listing_page_dir(base_dir, number):
+    return base_dir if number == 1 else f"{base_dir}/page/{number}"
+
+
+def entry_node(entry, section):
+    children = [LeafNode("a", entry["title"], {"href": entry["url"]})]
+    if entry["date"]:
+        children.append(LeafNode(None, " "))
+        children.append(LeafNode("time", entry["date"], {"datetime": entry["date"]}))
+    for tag in entry["tags"]:
+        children.append(LeafNode(None, " "))
+        children.append(LeafNode("a", tag, {"href": f"/{section}/tags/{slugify(tag)}/", "class": "tag"}))
+    if entry["description"]:
+        children.append(LeafNode("p", entry["description"]))
+    return ParentNode("li", children)
+
+
+def listing_node(title, entries, section, newer_dir=None, older_dir=None):
+    children = [LeafNode("h1", title)]
+    if entries:
+        children.append(ParentNode("ul", [entry_node(entry, section) for entry in entries]))
+    else:
+        children.append(LeafNode("p", "Nothing here yet."))
+    links = []
+    if newer_dir is not None:
+        links.append(LeafNode("a", "Newer", {"href": f"/{newer_dir}/", "rel": "prev"}))
+    if older_dir is not None:
+        if links:
+            links.append(LeafNode(None, " "))
+        links.append(LeafNode("a", "Older", {"href": f"/{older_dir}/", "rel": "next"}))
+    if links:
+        children.append(ParentNode("nav", links))
+    return ParentNode("div", children)
+
+
+def paged_listing(base_dir, title, entries, section, per_page):
+    pages = paginate(entries, per_page)
+    for number, page_entries in enumerate(pages, 1):
+        newer_dir = listing_page_dir(base_dir, number - 1) if number > 1 else None
+        older_dir = listing_page_dir(base_dir, number + 1) if number < len(pages) else None
+        page_title = title if number == 1 else f"{title} (page {number})"
+        yield listing_page_dir(base_dir, number), page_title, listing_node(
+            page_title, page_entries, section, newer_dir, older_dir
+        )
+
+
+def listing_pages(section, entries, per_page=DEFAULT_PER_PAGE):
+    # Yields (output directory relative to docs/, title, node) for the
+    # section's paginated listing and one paginated listing per tag.
+    entries = sort_entries(entry for entry in entries if entry is not None)
+    title = section_title(section)
+    yield from paged_listing(section, title, entries, section, per_page)
+
+    tags = {}
+    for entry in entries:
+        for tag in entry["tags"]:
+            tags.setdefault(slugify(tag), (tag, []))[1].append(entry)
+    for slug, (tag, tag_entries) in sorted(tags.items()):
+        if slug:
+            yield from paged_listing(f"{section}/tags/{slug}", f"{title}: {tag}", tag_entries, section, per_page)
@@ -1,91 +1,842 @@
-import os, shutil, sys
+import argparse, copy, io, os, posixpath, shutil, sys, time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
 from pathlib import Path
 
+from htmlnode import escape_html
 from textnode import TextNode, TextType
-from block_markdown import markdown_to_html_node, extract_title
+from block_markdown import (
+    DocumentSummary,
+    iter_markdown_blocks,
+    iter_markdown_html,
+    parse_document,
+)
+from inline_markdown import (
+    INLINE_ENGINES,
+    enable_inline_cache,
+    get_inline_engine,
+    inline_cache_info,
+    merge_inline_cache_info,
+    set_inline_engine,
+)
+from assets import COPY_STRATEGIES, materialize_file, sync_directory
+from fragment_cache import DEFAULT_MAX_BYTES, FragmentCache
+from front_matter import MetadataIndex, skip_front_matter, strip_front_matter
+from listing import DEFAULT_PER_PAGE, listing_entry, listing_pages, page_url
+from manifest import BuildManifest, hash_file
+from node_cache import TreeCache
+from page_output import open_page_output, write_page
+from pipeline import DEFAULT_BATCH_SIZE, pipeline_pages
+from search_index import SearchIndex
+from profiler import BuildProfiler, active_profiler, profile_phase, set_active_profiler
+from template import LAYOUT_NAME, TemplateCache
+from watch import watch
 
-def main():
-    build_basepath = Path(__file__).resolve().parent.parent
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site into docs/.")
+    parser.add_argument("base_path", nargs="?", default="/")
+    parser.add_argument(
+        "--root",
+        default=None,
+        help="site directory holding content/, static/ and template.html (default: the repository)",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="ignore the build manifest and rebuild every page",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="render pages in N worker processes (0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--assets",
+        choices=COPY_STRATEGIES,
+        default="copy",
+        help="how static files are materialized in docs/; falls back to copy",
+    )
+    parser.add_argument(
+        "--asset-workers",
+        type=positive_int,
+        default=None,
+        help="number of threads used to copy static files",
+    )
+    parser.add_argument(
+        "--inline-engine",
+        choices=INLINE_ENGINES,
+        default=get_inline_engine(),
+        help="inline Markdown parser implementation",
+    )
+    parser.add_argument(
+        "--inline-cache",
+        type=int,
+        default=0,
+        metavar="N",
+        help="memoize inline parsing of up to N distinct text fragments",
+    )
+    parser.add_argument(
+        "--fragment-cache",
+        action="store_true",
+        help="reuse rendered HTML for unchanged Markdown blocks across builds",
+    )
+    parser.add_argument(
+        "--fragment-cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="maximum size of the fragment cache in MiB",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="read sources ahead and write pages on background threads while "
+        "rendering, to hide file I/O latency (single process only)",
+    )
+    parser.add_argument(
+        "--tree-cache",
+        action="store_true",
+        help="keep parsed document trees in .build-cache/trees so that pages "
+        "whose Markdown is unchanged are re-rendered without parsing",
+    )
+    parser.add_argument(
+        "--listing",
+        action="append",
+        default=[],
+        metavar="SECTION",
+        help="generate paginated listing and tag pages for the pages under "
+        "content/SECTION from their front matter (may be repeated)",
+    )
+    parser.add_argument(
+        "--per-page",
+        type=positive_int,
+        default=DEFAULT_PER_PAGE,
+        help="entries per listing page",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a sharded full-text search index to docs/search/, "
+        "updated incrementally from per-page terms kept in .build-cache",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="record per-phase and per-page timings and write them as JSON "
+        "(default .build-cache/profile.json)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild whatever changes in content/, static/ or the template",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.05,
+        help="seconds between filesystem polls in watch mode",
+    )
+    return parser.parse_args(argv)
+
+
+# Pages waiting to be built. key, source_hash and template_hash are only set
+# when the build keeps a manifest.
+PendingPage = namedtuple(
+    "PendingPage",
+    ["source_path", "dest_dir", "layout_path", "key", "source_hash", "template_hash"],
+    defaults=(None, None, None),
+)
+
+
+class BuildOptions:
+    # How pages are built, and the caches and indexes a build reads and
+    # updates. One instance is passed through the build functions in place
+    # of their settings.
+    def __init__(
+        self,
+        base_path="/",
+        manifest=None,
+        jobs=1,
+        templates=None,
+        fragment_cache=None,
+        tree_cache=None,
+        pipeline=False,
+        search_index=None,
+        sections=(),
+        metadata_index=None,
+        per_page=DEFAULT_PER_PAGE,
+        asset_strategy="copy",
+    ):
+        self.base_path = base_path
+        self.manifest = manifest
+        self.jobs = jobs
+        self.templates = TemplateCache(base_path) if templates is None else templates
+        self.fragment_cache = fragment_cache
+        self.tree_cache = tree_cache
+        self.pipeline = pipeline
+        self.search_index = search_index
+        self.sections = sections
+        self.metadata_index = metadata_index
+        self.per_page = per_page
+        self.asset_strategy = asset_strategy
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    build_basepath = Path(args.root).resolve() if args.root else Path(__file__).resolve().parent.parent
     print(build_basepath)
-    dest_basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
+    dest_basepath = args.base_path
     content_dir = Path(os.path.join(build_basepath, "content"))
     static_dir = Path(os.path.join(build_basepath, "static"))
     template_dir = Path(os.path.join(build_basepath, "template.html"))
     doc_dir = Path(os.path.join(build_basepath, "docs"))
     doc_dest_dir = Path(os.path.join(dest_basepath, "docs"))
+    cache_dir = Path(os.path.join(build_basepath, ".build-cache"))
+
+    manifest = BuildManifest(
+        cache_dir / "manifest.json",
+        {"base_path": dest_basepath, "inline_engine": args.inline_engine},
+    )
+    profiler = None
+    if args.profile is not None:
+        profiler = BuildProfiler()
+        profiler.start()
+        set_active_profiler(profiler)
+
+    if args.clean or not manifest.load():
+        with profile_phase("clear"):
+            clear_directory(doc_dir)
+    set_inline_engine(args.inline_engine)
+    if args.inline_cache:
+        enable_inline_cache(args.inline_cache)
+    options = BuildOptions(
+        dest_basepath,
+        manifest,
+        jobs=args.jobs if args.jobs > 0 else os.cpu_count() or 1,
+        pipeline=args.pipeline,
+        sections=args.listing,
+        metadata_index=MetadataIndex(cache_dir / "metadata.json"),
+        per_page=args.per_page,
+        asset_strategy=args.assets,
+    )
+    if args.fragment_cache:
+        options.fragment_cache = FragmentCache(cache_dir / "fragments.sqlite3", args.fragment_cache_size * 1024 * 1024)
+    if args.tree_cache:
+        options.tree_cache = TreeCache(cache_dir / "trees")
+    if args.search:
+        options.search_index = SearchIndex(cache_dir / "search")
+        options.search_index.load()
+    page_outputs = generate_all_pages(content_dir, template_dir, doc_dir, options)
+    manifest.save()
+    search_outputs = set()
+    if options.search_index is not None:
+        with profile_phase("search index"):
+            search_outputs = write_search_index(options.search_index, doc_dir)
+    listing_outputs = set()
+    if options.sections:
+        options.metadata_index.load()
+        with profile_phase("listings"):
+            listing_outputs = generate_listings(content_dir, template_dir, doc_dir, options, page_outputs)
+        options.metadata_index.save()
+    # Static files are synced after the pages so that anything in docs/ that
+    # is neither a live page nor a static file can be removed as stale.
+    # When no page was added or removed and static/ is unchanged, the last
+    # sync still holds and docs/ is not rescanned.
+    with profile_phase("static copy"):
+        static_state = dict(manifest.static)
+        sync_directory(
+            static_dir,
+            doc_dir,
+            checksum=args.checksum,
+            keep=page_outputs | listing_outputs | search_outputs,
+            strategy=args.assets,
+            workers=args.asset_workers,
+            state=static_state,
+        )
+    manifest.record_static(static_state)
+    manifest.save()
+
+    if profiler is not None:
+        set_active_profiler(None)
+        profiler.stop()
+        profile_path = Path(args.profile) if args.profile else cache_dir / "profile.json"
+        profiler.write(profile_path)
+        print(profiler.summary())
+        print(f"Profile written to {profile_path}")
 
+    if args.watch:
+        print(f"Watching {content_dir}, {static_dir} and {template_dir} for changes.")
+        rebuild = make_rebuilder(
+            content_dir, static_dir, template_dir, doc_dir, options, page_outputs, listing_outputs, search_outputs
+        )
+        try:
+            watch([content_dir, static_dir, template_dir], rebuild, args.interval)
+        except KeyboardInterrupt:
+            pass
 
-    clear_directory(doc_dir)
-    copy_directory(static_dir, doc_dir)
-    generate_all_pages(content_dir, template_dir, doc_dir, dest_basepath)
+    if args.inline_cache:
+        info = inline_cache_info()
+        print(f"Inline cache: {info.hits} hits, {info.misses} misses, {info.currsize} entries.")
+    fragment_cache = options.fragment_cache
+    if fragment_cache is not None:
+        fragment_cache.close()
+        stats = fragment_cache.stats()
+        print(f"Fragment cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries, {stats['bytes']} bytes.")
+    tree_cache = options.tree_cache
+    if tree_cache is not None and tree_cache.hits + tree_cache.misses:
+        print(f"Tree cache: {tree_cache.hits} hits, {tree_cache.misses} misses.")
+
+def make_rebuilder(
+    content_dir, static_dir, template_dir, doc_dir, options, page_outputs, listing_outputs=None, search_outputs=None
+):
+    # Rebuilds run one page at a time in this process, whatever
+    # options.jobs and options.pipeline say.
+    if listing_outputs is None:
+        listing_outputs = set()
+    if search_outputs is None:
+        search_outputs = set()
+    manifest = options.manifest
+    search_index = options.search_index
+    serial_options = copy.copy(options)
+    serial_options.jobs = 1
+    serial_options.pipeline = False
+
+    def is_under(path, directory):
+        return directory in path.parents
+
+    def rebuild(changed, removed):
+        started = time.perf_counter()
+        touched = changed | removed
+        try:
+            layouts_changed = any(
+                path == template_dir or (path.name == LAYOUT_NAME and is_under(path, content_dir))
+                for path in touched
+            )
+            if layouts_changed:
+                # Every page using a changed layout is stale; the manifest
+                # works out which ones those are.
+                options.templates.layouts.clear()
+                page_outputs.clear()
+                page_outputs.update(generate_all_pages(content_dir, template_dir, doc_dir, serial_options))
+            else:
+                pages = sorted(path for path in changed if path.suffix == ".md" and is_under(path, content_dir))
+                page_outputs.update(generate_pages(pages, content_dir, template_dir, doc_dir, serial_options))
+                for path in sorted(removed):
+                    if path.suffix == ".md" and is_under(path, content_dir):
+                        key = path.relative_to(content_dir).as_posix()
+                        output = manifest.remove_page(key)
+                        if search_index is not None:
+                            search_index.remove(key)
+                        if output is not None:
+                            page_outputs.discard(output)
+                            remove_page_output(doc_dir, doc_dir / output)
+
+            if options.sections and (
+                layouts_changed or any(path.suffix == ".md" and is_under(path, content_dir) for path in touched)
+            ):
+                outputs = generate_listings(content_dir, template_dir, doc_dir, options, page_outputs)
+                for output in sorted(listing_outputs - outputs):
+                    remove_page_output(doc_dir, doc_dir / output)
+                listing_outputs.clear()
+                listing_outputs.update(outputs)
+                options.metadata_index.save()
+
+            if search_index is not None:
+                outputs = write_search_index(search_index, doc_dir)
+                for output in sorted(search_outputs - outputs):
+                    remove_page_output(doc_dir, doc_dir / output)
+                search_outputs.clear()
+                search_outputs.update(outputs)
+
+            for path in sorted(touched):
+                if not is_under(path, static_dir):
+                    continue
+                rel_path = path.relative_to(static_dir).as_posix()
+                target_path = doc_dir / rel_path
+                if rel_path in page_outputs or rel_path in listing_outputs or rel_path in search_outputs:
+                    continue
+                if path in changed:
+                    print(f"Copying: {path} to {target_path}")
+                    os.makedirs(target_path.parent, exist_ok=True)
+                    materialize_file(path, target_path, options.asset_strategy)
+                elif os.path.lexists(target_path):
+                    print(f"Removing: {target_path}")
+                    os.unlink(target_path)
+            manifest.save()
+        except Exception as error:
+            print(f"Rebuild failed: {error}")
+            return
+        print(f"Rebuilt {len(touched)} changed file(s) in {(time.perf_counter() - started) * 1000:.1f} ms.")
+
+    return rebuild
 
 def clear_directory(path):
     if os.path.exists(path):
         for child in Path(path).iterdir():
-            if Path.is_dir(child):
-                clear_directory(child)
+            if Path.is_dir(child) and not Path.is_symlink(child):
                 shutil.rmtree(child)
             else:
                 os.unlink(child)
 
 
-def copy_directory(source, target):
-    if not os.path.exists(source):
-        os.makedirs(source, exist_ok=True)
-        return
-    
-    if not os.path.exists(target):
-        os.makedirs(target, exist_ok=True)
-    
-    for child in os.listdir(source):
-        source_loc = Path(os.path.join(source, child))
-        target_loc = Path(os.path.join(target, child))
-        print(f"Copying: {source_loc} to {target_loc}")
-        if Path.is_dir(source_loc):
-            if not os.path.exists(target_loc):
-                os.makedirs(target_loc, exist_ok=True)
-            copy_directory(source_loc, target_loc)
-        else:
-           shutil.copy(source_loc, target_loc)
-
-           
-def generate_all_pages(dir_path_content, template_path, dest_dir_path, base_path):
+def generate_all_pages(dir_path_content, template_path, dest_dir_path, options=None):
+    if options is None:
+        options = BuildOptions()
     source_dir = Path(dir_path_content)
-    template_dir = Path(template_path)
     dest_dir = Path(dest_dir_path)
+    md_paths = find_markdown(source_dir)
+    outputs = generate_pages(md_paths, source_dir, template_path, dest_dir, options)
+
+    manifest = options.manifest
+    if manifest is not None:
+        source_prefix = os.path.join(source_dir, "")
+        live_keys = {page_key(md_path, source_prefix) for md_path in md_paths}
+        for output in manifest.remove_stale(live_keys):
+            remove_page_output(dest_dir, dest_dir / output)
+        if options.tree_cache is not None:
+            options.tree_cache.prune(page["source"] for page in manifest.pages.values())
+        if options.search_index is not None:
+            options.search_index.prune(live_keys)
+
+    return outputs
+
+
+def find_markdown(source_dir):
+    # Same paths, in the same order, as sorted(source_dir.rglob("*.md")),
+    # without building a Path for every directory entry.
+    names = []
+    for directory, _, file_names in os.walk(source_dir):
+        names.extend(os.path.join(directory, name) for name in file_names if name.endswith(".md"))
+    names.sort(key=lambda name: name.split(os.sep))
+    return [Path(name) for name in names]
+
+
+def generate_pages(md_paths, source_dir, template_path, dest_dir, options=None):
+    # The search index needs a summary, with terms, of every page whose
+    # source it has not seen; such pages are rebuilt even when their output
+    # is current.
+    if options is None:
+        options = BuildOptions()
+    manifest = options.manifest
+    search_index = options.search_index
+    template_dir = Path(template_path)
+    template_hashes = {}
+    outputs = set()
+    pending = []
+    summaries = {} if search_index is not None and manifest is not None else None
+
+    # Keys and outputs are cut from path strings rather than built with
+    # relative_to, which is slow enough to show up in no-op builds.
+    source_prefix = os.path.join(source_dir, "")
+    for md_path in md_paths:
+        key = page_key(md_path, source_prefix)
+        output = page_output_path(key)
+        outputs.add(output)
+        layout_path = options.templates.find_layout(md_path, source_dir, template_dir)
+        if manifest is None:
+            pending.append(PendingPage(md_path, dest_dir / posixpath.dirname(key), layout_path))
+            continue
+
+        if layout_path not in template_hashes:
+            template_hashes[layout_path] = manifest.file_hash(layout_path)
+        template_hash = template_hashes[layout_path]
+        source_hash = manifest.file_hash(md_path)
+        if summaries is not None and not search_index.is_current(key, source_hash):
+            summaries[md_path] = DocumentSummary(terms={})
+        elif manifest.is_current(key, source_hash, template_hash, os.path.join(dest_dir, output)):
+            continue
+        pending.append(
+            PendingPage(md_path, dest_dir / posixpath.dirname(key), layout_path, key, source_hash, template_hash)
+        )
+
+    for page in build_pages(pending, options, summaries):
+        if manifest is not None:
+            manifest.record(page.key, page.source_path, page.source_hash, page.template_hash, page_output_path(page.key))
+        summary = summaries.get(page.source_path) if summaries else None
+        if summary is not None:
+            search_index.update(page.key, page.source_hash, page_url(page.key), summary.title, summary.terms)
+
+    return outputs
+
+
+def page_key(md_path, source_prefix):
+    # The source path relative to the content directory, with forward
+    # slashes; source_prefix is the content directory with a trailing
+    # separator.
+    return os.fspath(md_path)[len(source_prefix):].replace(os.sep, "/")
+
+
+def page_output_path(key):
+    # Every page is written to the index.html of its source's directory.
+    return posixpath.join(posixpath.dirname(key), "index.html")
+
+
+def generate_listings(content_dir, template_path, dest_dir, options, page_outputs=()):
+    # Listing pages come from the front matter index alone; no page body is
+    # read or parsed. Pages whose HTML is unchanged are not rewritten.
+    templates = options.templates
+    metadata_index = options.metadata_index
+    content_dir = Path(content_dir)
+    dest_dir = Path(dest_dir)
+    outputs = set()
+    live_keys = []
+    for section in options.sections:
+        section = section.strip("/")
+        section_dir = content_dir / section
+        if not section_dir.is_dir():
+            raise ValueError(f"no content section at {section_dir}")
+        entries = []
+        for md_path in sorted(section_dir.rglob("*.md")):
+            key = md_path.relative_to(content_dir).as_posix()
+            live_keys.append(key)
+            # The section's own index page is not one of its entries.
+            if md_path.parent != section_dir:
+                entries.append(listing_entry(key, metadata_index.get(md_path, key)))
+
+        layout_path = templates.find_layout(section_dir / "index.md", content_dir, template_path)
+        template = templates.get(layout_path)
+        for rel_dir, title, node in listing_pages(section, entries, options.per_page):
+            output = f"{rel_dir}/index.html"
+            if output in page_outputs:
+                index_path = content_dir / rel_dir / "index.md"
+                if not index_path.exists():
+                    raise ValueError(f"listing page {output} would overwrite a page built from {content_dir}")
+                # An authored index page wins; the listing is merged into it.
+                index_template = templates.get(templates.find_layout(index_path, content_dir, template_path))
+                write_page_if_changed(dest_dir / rel_dir, render_listing_into_page(index_path, index_template, node))
+                continue
+            outputs.add(output)
+            page_html = template.render(Title=escape_html(title), Content=node.iter_html(template.base_path))
+            write_page_if_changed(dest_dir / rel_dir, page_html)
+    metadata_index.prune(live_keys)
+    return outputs
+
+
+def render_listing_into_page(md_path, template, node):
+    # The page keeps its own title and text, followed by the listing's
+    # entries and navigation without the listing's heading.
+    with open(md_path) as source_content_stream:
+        source_node, summary = parse_document(strip_front_matter(source_content_stream.read()))
+    listing_html = [child.iter_html(template.base_path) for child in node.children[1:]]
+    return template.render(
+        Title=escape_html(summary.require_title()),
+        Content=chain(source_node.iter_html(template.base_path), *listing_html),
+    )
+
+
+def write_search_index(search_index, dest_dir):
+    outputs, written = search_index.write(dest_dir)
+    search_index.save()
+    print(f"Search index: {written} of {len(outputs) - 1} shards written.")
+    return outputs
 
-    for md_path in source_dir.rglob("*.md"):
-        rel_path = md_path.relative_to(source_dir).parent
-        page_dest_path = dest_dir / rel_path
-        generate_page(md_path, template_dir, page_dest_path, base_path)
+
+def build_pages(pages, options, summaries=None):
+    # summaries maps the source path of each page that needs one to an
+    # empty DocumentSummary, which is filled in while the page is rendered.
+    if summaries is None:
+        summaries = {}
+    jobs = options.jobs
+    pipeline = options.pipeline
+    if active_profiler() is not None and (jobs > 1 or pipeline):
+        print("Profiling measures pages one at a time in this process; ignoring --jobs and --pipeline.")
+        jobs = 1
+        pipeline = False
+    if pipeline and jobs > 1:
+        print("Worker processes already overlap rendering with writing; ignoring --pipeline.")
+        pipeline = False
+    if pipeline:
+        yield from pipeline_build_pages(pages, options, summaries)
+        return
+    if jobs <= 1 or len(pages) <= 1:
+        for page in pages:
+            build_page(page, options, summaries.get(page.source_path))
+            yield page
+        return
+
+    # Workers only parse and render; the parent writes every page in source
+    # order so the output does not depend on scheduling.
+    fragment_cache = options.fragment_cache
+    chunksize = max(1, len(pages) // (jobs * 4))
+    executor = ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=init_worker,
+        initargs=(
+            options.base_path,
+            get_inline_engine(),
+            inline_cache_info().maxsize if inline_cache_info() else 0,
+            fragment_cache.path if fragment_cache else None,
+            fragment_cache.max_bytes if fragment_cache else None,
+            options.tree_cache.directory if options.tree_cache else None,
+        ),
+    )
+    try:
+        rendered = executor.map(
+            render_page_job,
+            pages,
+            [page.source_path in summaries for page in pages],
+            chunksize=chunksize,
+        )
+        for page, (page_html, summary_json, worker_stats) in zip(pages, rendered):
+            print(f"Generating page from {page.source_path} to {page.dest_dir} using {page.layout_path}.")
+            write_page(page.dest_dir, page_html)
+            if summary_json is not None:
+                summaries[page.source_path].merge(DocumentSummary.from_json(summary_json))
+            merge_worker_stats(worker_stats, fragment_cache)
+            yield page
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+
+
+def pipeline_build_pages(pages, options, summaries=None):
+    if summaries is None:
+        summaries = {}
+
+    def render(page, source_content):
+        print(f"Generating page from {page.source_path} to {page.dest_dir} using {page.layout_path}.")
+        template = options.templates.get(page.layout_path)
+        return render_source(page, source_content, template, options, summaries.get(page.source_path))
+
+    # Fragment cache puts are committed, and the cache trimmed, once per
+    # writer batch, and whatever was rendered before a failure is kept.
+    fragment_cache = options.fragment_cache
+    try:
+        for count, page in enumerate(pipeline_pages(pages, render), 1):
+            if fragment_cache is not None and count % DEFAULT_BATCH_SIZE == 0:
+                fragment_cache.flush()
+            yield page
+    finally:
+        if fragment_cache is not None:
+            fragment_cache.flush()
+
+
+def remove_page_output(dest_dir, output_path):
+    print(f"Removing stale page {output_path}")
+    if os.path.exists(output_path):
+        os.unlink(output_path)
+    parent = output_path.parent
+    while parent != dest_dir and parent.is_dir() and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+
+class PageBuildError(Exception):
+    def __init__(self, source_path, message):
+        super().__init__(source_path, message)
+        self.source_path = source_path
+        self.message = message
+
+    def __str__(self):
+        return f"{self.source_path}: {self.message}"
+
+
+_worker_options = None
+
+
+def init_worker(
+    base_path, inline_engine, inline_cache_size, fragment_cache_path, fragment_cache_size, tree_cache_directory=None
+):
+    global _worker_options
+    set_inline_engine(inline_engine)
+    if inline_cache_size:
+        enable_inline_cache(inline_cache_size)
+    _worker_options = BuildOptions(base_path)
+    if fragment_cache_path is not None:
+        _worker_options.fragment_cache = FragmentCache(fragment_cache_path, fragment_cache_size)
+    if tree_cache_directory is not None:
+        _worker_options.tree_cache = TreeCache(tree_cache_directory)
+
+
+def render_page_job(page, summarize=False):
+    # Returns the page HTML, its summary as JSON if asked for, and the
+    # worker's cache counters so far (see merge_worker_stats).
+    try:
+        summary = DocumentSummary(terms={}) if summarize else None
+        template = _worker_options.templates.get(page.layout_path)
+        page_html = render_page(page, template, _worker_options, summary)
+        if _worker_options.fragment_cache is not None:
+            _worker_options.fragment_cache.flush()
+        return page_html, None if summary is None else summary.to_json(), worker_stats()
+    except Exception as error:
+        raise PageBuildError(str(page.source_path), f"{type(error).__name__}: {error}") from None
+
+
+def worker_stats():
+    fragment_cache = _worker_options.fragment_cache
+    fragment_stats = None
+    if fragment_cache is not None:
+        fragment_stats = (fragment_cache.hits, fragment_cache.misses)
+    inline_stats = None
+    info = inline_cache_info()
+    if info is not None:
+        inline_stats = (info.hits, info.misses, info.currsize)
+    return os.getpid(), fragment_stats, inline_stats
 
 
+def merge_worker_stats(stats, fragment_cache=None):
+    # Workers report running totals, so the latest report from each one
+    # replaces its previous report.
+    worker, fragment_stats, inline_stats = stats
+    if fragment_cache is not None and fragment_stats is not None:
+        fragment_cache.merge_stats(worker, *fragment_stats)
+    if inline_stats is not None:
+        merge_inline_cache_info(worker, *inline_stats)
+
+
+def render_page(page, template, options, summary=None):
+    return "".join(iter_page_html(page, template, options, summary))
+
+
+def iter_page_html(page, template, options, summary=None):
+    # A summary passed in is filled in as the page is parsed.
+    if not os.path.exists(page.source_path):
+        raise ValueError(f"no file exists at {page.source_path}")
+
+    if options.tree_cache is not None:
+        source_node, source_title = load_page_tree(page.source_path, options.tree_cache, page.source_hash, summary=summary)
+        yield from template.iter_render(
+            Title=escape_html(source_title), Content=source_node.iter_html(template.base_path)
+        )
+        return
+
+    with open(page.source_path) as source_content_stream:
+        yield from iter_source_html(skip_front_matter(source_content_stream), template, options.fragment_cache, summary)
+
+
+def iter_source_html(source_content_stream, template, fragment_cache=None, summary=None):
+    # The title has to be written before the content, but the parser finds
+    # it on its one pass through the source: content is held back only
+    # until the block holding the title has been parsed.
+    if summary is None:
+        summary = DocumentSummary()
+    source_html = iter_markdown_html(
+        iter_markdown_blocks(source_content_stream), fragment_cache, template.base_path, summary
+    )
+    held = []
+    for fragment in source_html:
+        held.append(fragment)
+        if summary.title is not None:
+            break
+    source_title = summary.require_title()
+    yield from template.iter_render(Title=escape_html(source_title), Content=chain(held, source_html))
+
+
+def render_source(page, source_content, template, options, summary=None):
+    # Renders a page whose source has already been read into memory.
+    if options.tree_cache is not None:
+        source_node, source_title = load_page_tree(
+            page.source_path, options.tree_cache, page.source_hash, source_content, summary
+        )
+        return template.render(Title=escape_html(source_title), Content=source_node.iter_html(template.base_path))
+    return "".join(
+        iter_source_html(io.StringIO(strip_front_matter(source_content)), template, options.fragment_cache, summary)
+    )
+
+
+def load_page_tree(from_path, tree_cache, source_hash=None, source_content=None, summary=None):
+    # The whole tree is parsed on a miss, rather than streamed, so that it
+    # can be stored as a document tree instead of cached block fragments.
+    # Cached trees carry no summary, so asking for one means parsing.
+    if source_hash is None:
+        source_hash = hash_file(from_path)
+    if summary is None:
+        tree = tree_cache.get(source_hash)
+        if tree is not None:
+            return tree
+    if source_content is None:
+        with open(from_path) as source_content_stream:
+            source_content = source_content_stream.read()
+    source_node, summary = parse_document(strip_front_matter(source_content), summary=summary)
+    source_title = summary.require_title()
+    tree_cache.put(source_hash, source_node, source_title)
+    return source_node, source_title
+
+
+def write_page_if_changed(dest_path, page_html):
+    try:
+        with open(os.path.join(dest_path, "index.html")) as page_content_stream:
+            if page_content_stream.read() == page_html:
+                return False
+    except OSError:
+        pass
+    print(f"Generating listing page {dest_path}.")
+    write_page(dest_path, page_html)
+    return True
+
 
 def generate_page(from_path, template_path, dest_path, base_path):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}.")
-    if not os.path.exists(from_path):
-        raise ValueError(f"no file exists at {from_path}")
+    build_page(PendingPage(from_path, dest_path, template_path), BuildOptions(base_path))
+
+
+def build_page(page, options, summary=None):
+    print(f"Generating page from {page.source_path} to {page.dest_dir} using {page.layout_path}.")
+    profiler = active_profiler()
+    if profiler is not None:
+        with profiler.page(page.source_path):
+            build_page_profiled(profiler, page, options, summary)
+        return
+
+    template = options.templates.get(page.layout_path)
+
+    if not os.path.exists(page.source_path):
+        raise ValueError(f"no file exists at {page.source_path}")
 
-    if not os.path.exists(dest_path):
-        os.makedirs(dest_path,exist_ok=True)
-    with open(from_path, "r+") as source_content_stream:
-        source_content = source_content_stream.read()
-        source_title = extract_title(source_content)
-        source_html = markdown_to_html_node(source_content).to_html()
+    with open_page_output(page.dest_dir) as page_content_stream:
+        page_content_stream.writelines(iter_page_html(page, template, options, summary))
+    if options.fragment_cache is not None:
+        options.fragment_cache.flush()
 
-    with open(template_path) as template_content_stream:
-        page_html = template_content_stream.read()
-        page_html = page_html.replace("{{ Title }}", source_title, 1)
-        page_html = page_html.replace("{{ Content }}", source_html, 1)
-        page_html = page_html.replace('href="/', f'href="{base_path}')
-        page_html = page_html.replace('src="/', f'src="{base_path}')
 
-    with open(os.path.join(dest_path, "index.html"), "w") as page_content_stream:
-        page_content_stream.write(page_html)
+def build_page_profiled(profiler, page, options, summary=None):
+    # Runs each phase to completion instead of streaming, so that read,
+    # parse, render and write can be timed separately.
+    with profiler.phase("template load"):
+        template = options.templates.get(page.layout_path)
 
+    if not os.path.exists(page.source_path):
+        raise ValueError(f"no file exists at {page.source_path}")
 
-    if not os.path.exists(dest_path):
-        os.makedirs(dest_path, exist_ok=True)
+    if options.tree_cache is not None:
+        with profiler.phase("parse"):
+            source_node, source_title = load_page_tree(
+                page.source_path, options.tree_cache, page.source_hash, summary=summary
+            )
+    else:
+        with profiler.phase("read"):
+            with open(page.source_path) as source_content_stream:
+                source_content = source_content_stream.read()
+        with profiler.phase("parse"):
+            source_node, summary = parse_document(
+                strip_front_matter(source_content), options.fragment_cache, base_path=template.base_path, summary=summary
+            )
+            source_title = summary.require_title()
+    with profiler.phase("render"):
+        page_html = template.render(Title=escape_html(source_title), Content=source_node.to_html(template.base_path))
+    with profiler.phase("write"):
+        write_page(page.dest_dir, page_html)
+    if options.fragment_cache is not None:
+        options.fragment_cache.flush()
 
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import hashlib, json, os, uuid
+from pathlib import Path
+
+# Bump whenever a change to the builder alters the generated output, so that
+# every page is rebuilt on the next run.
+BUILDER_VERSION = "4"
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for chunk in iter(lambda: stream.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, path, config=None):
+        self.path = Path(path)
+        self.config = dict(config or {})
+        self.config["builder"] = BUILDER_VERSION
+        self.files = {}
+        self.pages = {}
+        # sync_state() of the last static sync (see assets.sync_directory).
+        self.static = {}
+        # Saves append the entries changed since the last save to a journal
+        # next to the manifest, and only rewrite the manifest itself once
+        # the journal outgrows half of it. The journal starts with the
+        # generation of the manifest it applies to.
+        self.journal_path = self.path.with_suffix(".journal")
+        self.generation = None
+        self.manifest_size = 0
+        self.journal_size = 0
+        self.changes = set()
+        self.dirty = False
+
+    def load(self):
+        try:
+            with open(self.path) as manifest_stream:
+                data = json.load(manifest_stream)
+        except (OSError, ValueError):
+            return False
+
+        if not isinstance(data, dict) or data.get("config") != self.config:
+            return False
+
+        self.files = data.get("files", {})
+        self.pages = data.get("pages", {})
+        self.static = data.get("static", {})
+        self.generation = data.get("generation")
+        self.manifest_size = os.path.getsize(self.path)
+        self.load_journal()
+        return True
+
+    def load_journal(self):
+        try:
+            with open(self.journal_path) as journal_stream:
+                lines = journal_stream.readlines()
+        except OSError:
+            lines = []
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except ValueError:
+            header = None
+        if header != {"generation": self.generation}:
+            # Left behind by an older manifest: the next save starts afresh.
+            self.generation = None
+            return
+        self.journal_size = sum(len(line) for line in lines)
+        for line in lines[1:]:
+            try:
+                section, key, value = json.loads(line)
+            except ValueError:
+                section = None
+            if section is None or not line.endswith("\n"):
+                # Cut short by an interrupted save: drop it, and rewrite
+                # the manifest on the next save.
+                self.generation = None
+                return
+            if section == "static":
+                self.static = value
+            elif value is None:
+                getattr(self, section).pop(key, None)
+            else:
+                getattr(self, section)[key] = value
+
+    def changed(self, section, key=None):
+        self.changes.add((section, key))
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(self.path.parent, exist_ok=True)
+        entries = []
+        for section, key in sorted(self.changes, key=lambda change: (change[0], change[1] or "")):
+            value = self.static if section == "static" else getattr(self, section).get(key)
+            entries.append(json.dumps([section, key, value], sort_keys=True) + "\n")
+        size = sum(len(entry) for entry in entries)
+        if self.generation is None or self.journal_size + size > self.manifest_size // 2:
+            self.rewrite()
+        else:
+            with open(self.journal_path, "a") as journal_stream:
+                journal_stream.writelines(entries)
+            self.journal_size += size
+        self.changes.clear()
+        self.dirty = False
+
+    def rewrite(self):
+        # A new generation makes the old journal stale even if the process
+        # dies before the new, empty one replaces it.
+        generation = uuid.uuid4().hex
+        data = {
+            "config": self.config,
+            "generation": generation,
+            "files": self.files,
+            "pages": self.pages,
+            "static": self.static,
+        }
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w") as manifest_stream:
+            json.dump(data, manifest_stream, sort_keys=True)
+        os.replace(temp_path, self.path)
+        header = json.dumps({"generation": generation}) + "\n"
+        with open(temp_path, "w") as journal_stream:
+            journal_stream.write(header)
+        os.replace(temp_path, self.journal_path)
+        self.generation = generation
+        self.manifest_size = os.path.getsize(self.path)
+        self.journal_size = len(header)
+
+    def file_hash(self, path):
+        # Only re-read files whose size or mtime moved since the last build.
+        key = str(path)
+        stat = os.stat(path)
+        cached = self.files.get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+
+        digest = hash_file(path)
+        self.files[key] = [stat.st_mtime_ns, stat.st_size, digest]
+        self.changed("files", key)
+        return digest
+
+    def is_current(self, key, source_hash, template_hash, output_path):
+        page = self.pages.get(key)
+        if not page:
+            return False
+        return (
+            page["source"] == source_hash
+            and page["template"] == template_hash
+            and os.path.exists(output_path)
+        )
+
+    def record(self, key, source_path, source_hash, template_hash, output):
+        self.pages[key] = {
+            "path": str(source_path),
+            "source": source_hash,
+            "template": template_hash,
+            "output": str(output),
+        }
+        self.changed("pages", key)
+
+    def record_static(self, state):
+        if state != self.static:
+            self.static = state
+            self.changed("static")
+
+    def remove_page(self, key):
+        page = self.pages.pop(key, None)
+        if page is None:
+            return None
+        self.files.pop(page["path"], None)
+        self.changed("pages", key)
+        self.changed("files", page["path"])
+        return page["output"]
+
+    def remove_stale(self, live_keys):
+        stale = [key for key in self.pages if key not in live_keys]
+        return [self.remove_page(key) for key in stale]
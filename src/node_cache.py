@@ -0,0 +1,186 @@
+import hashlib, os, struct, sys
+from array import array
+from pathlib import Path
+
+from fragment_cache import render_fingerprint
+from htmlnode import LeafNode, ParentNode, RawHTMLNode
+
+# Binary layout, all integers little-endian:
+#   header    magic, format version, string count, integer count
+#   lengths   uint32 byte length of each string in the table
+#   strings   the UTF-8 strings, back to back
+#   integers  int32 stream: the title's string index, then every node in
+#             preorder as kind, tag, value, prop count, child count, followed
+#             by a (key, value) string index pair per prop.
+# A string index of -1 stands for None, as does a prop or child count of -1.
+TREE_MAGIC = b"SSBT"
+TREE_FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHII")
+
+LEAF, PARENT, RAW = 0, 1, 2
+NONE = -1
+
+
+def dump_tree(node, title=None):
+    strings = {}
+    integers = array("i")
+
+    def string_index(value):
+        if value is None:
+            return NONE
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    integers.append(string_index(title))
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, ParentNode):
+            kind = PARENT
+        elif isinstance(current, RawHTMLNode):
+            kind = RAW
+        else:
+            kind = LEAF
+        props = current.props
+        children = current.children if kind == PARENT else None
+        integers.extend((
+            kind,
+            string_index(current.tag),
+            string_index(current.value),
+            NONE if props is None else len(props),
+            NONE if children is None else len(children),
+        ))
+        if props:
+            for key, value in props.items():
+                integers.append(string_index(key))
+                integers.append(string_index(value))
+        if children:
+            stack.extend(reversed(children))
+
+    encoded = [value.encode() for value in strings]
+    lengths = array("I", [len(value) for value in encoded])
+    if sys.byteorder == "big":
+        lengths.byteswap()
+        integers.byteswap()
+    return b"".join((
+        HEADER.pack(TREE_MAGIC, TREE_FORMAT_VERSION, len(encoded), len(integers)),
+        lengths.tobytes(),
+        *encoded,
+        integers.tobytes(),
+    ))
+
+
+def load_tree(data):
+    # Returns (node, title).
+    if len(data) < HEADER.size:
+        raise ValueError("truncated tree data")
+    magic, version, string_count, integer_count = HEADER.unpack_from(data)
+    if magic != TREE_MAGIC or version != TREE_FORMAT_VERSION:
+        raise ValueError("unsupported tree data")
+
+    offset = HEADER.size
+    lengths = array("I")
+    lengths.frombytes(data[offset:offset + 4 * string_count])
+    offset += 4 * string_count
+    if sys.byteorder == "big":
+        lengths.byteswap()
+    strings = []
+    for length in lengths:
+        strings.append(data[offset:offset + length].decode())
+        offset += length
+    integers = array("i")
+    integers.frombytes(data[offset:offset + 4 * integer_count])
+    if len(integers) != integer_count or offset + 4 * integer_count != len(data):
+        raise ValueError("truncated tree data")
+    if sys.byteorder == "big":
+        integers.byteswap()
+
+    try:
+        return read_nodes(integers, strings)
+    except IndexError:
+        raise ValueError("corrupt tree data") from None
+
+
+def read_nodes(integers, strings):
+    def string(index):
+        return None if index == NONE else strings[index]
+
+    integer_count = len(integers)
+    title = string(integers[0])
+    root = None
+    # Each entry is [parent node, children still to read].
+    stack = []
+    position = 1
+    while position < integer_count:
+        kind, tag, value, prop_count, child_count = integers[position:position + 5]
+        position += 5
+        props = None
+        if prop_count != NONE:
+            props = {}
+            for _ in range(prop_count):
+                props[strings[integers[position]]] = string(integers[position + 1])
+                position += 2
+
+        if kind == PARENT:
+            node = ParentNode(string(tag), None if child_count == NONE else [], props)
+        elif kind == RAW:
+            node = RawHTMLNode(string(value))
+        else:
+            node = LeafNode(string(tag), string(value), props)
+
+        if stack:
+            stack[-1][0].children.append(node)
+            stack[-1][1] -= 1
+        else:
+            root = node
+        if kind == PARENT and child_count > 0:
+            stack.append([node, child_count])
+        while stack and stack[-1][1] == 0:
+            stack.pop()
+
+    if root is None or stack:
+        raise ValueError("truncated tree data")
+    return root, title
+
+
+class TreeCache:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, source_hash):
+        key = hashlib.sha256(f"{render_fingerprint()}\0{source_hash}".encode()).hexdigest()
+        return self.directory / key[:2] / f"{key}.bin"
+
+    def get(self, source_hash):
+        try:
+            with open(self.path(source_hash), "rb") as tree_stream:
+                tree = load_tree(tree_stream.read())
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return tree
+
+    def put(self, source_hash, node, title=None):
+        path = self.path(source_hash)
+        os.makedirs(path.parent, exist_ok=True)
+        # Unique per process, since parallel workers may store the same tree.
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "wb") as tree_stream:
+            tree_stream.write(dump_tree(node, title))
+        os.replace(temp_path, path)
+
+    def prune(self, live_source_hashes):
+        live = {self.path(source_hash) for source_hash in live_source_hashes}
+        removed = 0
+        if not self.directory.is_dir():
+            return removed
+        for path in self.directory.glob("*/*.bin"):
+            if path not in live:
+                os.unlink(path)
+                removed += 1
+        return removed
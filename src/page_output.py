@@ -0,0 +1,27 @@
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def open_page_output(dest_path, make_dirs=True):
+    # Pages are written to a temporary file and moved into place, so a
+    # failure halfway through a streamed page never leaves a partial file.
+    # A caller that has already created dest_path passes make_dirs=False.
+    if make_dirs and not os.path.exists(dest_path):
+        os.makedirs(dest_path, exist_ok=True)
+
+    page_path = os.path.join(dest_path, "index.html")
+    temp_path = page_path + ".tmp"
+    try:
+        with open(temp_path, "w") as page_content_stream:
+            yield page_content_stream
+        os.replace(temp_path, page_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def write_page(dest_path, page_html, make_dirs=True):
+    with open_page_output(dest_path, make_dirs) as page_content_stream:
+        page_content_stream.write(page_html)
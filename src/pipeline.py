@@ -0,0 +1,131 @@
+import os, queue, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from page_output import write_page
+
+DEFAULT_READERS = 4
+DEFAULT_DEPTH = 16
+DEFAULT_BATCH_SIZE = 16
+
+_DONE = object()
+
+
+class WriteFailure:
+    def __init__(self, error):
+        self.error = error
+
+
+def read_source(path):
+    with open(path) as source_stream:
+        return source_stream.read()
+
+
+class PageWriter(threading.Thread):
+    # Takes rendered pages off a bounded queue in batches: the batch's
+    # missing directories are created first, each only once per build, and
+    # then its pages are written in order with page_output.write_page, the
+    # same atomic write the other build modes use.
+    def __init__(self, depth=DEFAULT_DEPTH, batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(name="page-writer", daemon=True)
+        self.pending = queue.Queue(maxsize=depth)
+        self.finished = queue.Queue()
+        self.batch_size = batch_size
+        self.directories = set()
+        self.failed = False
+        self.closing = False
+        self.stopped = False
+
+    def run(self):
+        while True:
+            batch = [self.pending.get()]
+            while len(batch) < self.batch_size and batch[-1] is not _DONE:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            done = batch[-1] is _DONE
+            if done:
+                batch.pop()
+            if batch and not self.failed:
+                self.write_batch(batch)
+            if done:
+                self.finished.put(_DONE)
+                return
+
+    def write_batch(self, batch):
+        try:
+            for _, dest_dir, _ in batch:
+                if dest_dir not in self.directories:
+                    os.makedirs(dest_dir, exist_ok=True)
+                    self.directories.add(dest_dir)
+            for page, dest_dir, page_html in batch:
+                write_page(dest_dir, page_html, make_dirs=False)
+                self.finished.put(page)
+        except BaseException as error:
+            # Keep draining the queue so the producer never blocks, but
+            # write nothing more.
+            self.failed = True
+            self.finished.put(WriteFailure(error))
+
+    def completed(self, block=False):
+        while not self.stopped:
+            try:
+                item = self.finished.get(block=block)
+            except queue.Empty:
+                return
+            if item is _DONE:
+                self.stopped = True
+                return
+            if isinstance(item, WriteFailure):
+                raise item.error
+            yield item
+
+    def finish(self):
+        self.closing = True
+        self.pending.put(_DONE)
+        return self.completed(block=True)
+
+    def abort(self):
+        # Lets the writer run to the end of its queue and discards whatever
+        # it reports, so the error that stopped the build is the one raised.
+        if not self.stopped:
+            if not self.closing:
+                self.pending.put(_DONE)
+            while self.finished.get() is not _DONE:
+                pass
+            self.stopped = True
+        self.join()
+
+
+def pipeline_pages(pages, render, readers=DEFAULT_READERS, depth=DEFAULT_DEPTH, batch_size=DEFAULT_BATCH_SIZE):
+    # Overlaps the three stages of a build: a thread pool reads up to depth
+    # sources ahead, the calling thread renders them with
+    # render(page, source), and a writer thread writes the results. Each
+    # page is a tuple whose first two items are the source path and the
+    # output directory. Pages are yielded in order, once written.
+    writer = PageWriter(depth, batch_size)
+    writer.start()
+    reads = deque()
+    page_iter = iter(pages)
+    executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="page-reader")
+
+    def prefetch():
+        while len(reads) < depth:
+            page = next(page_iter, None)
+            if page is None:
+                return
+            reads.append((page, executor.submit(read_source, page[0])))
+
+    try:
+        prefetch()
+        while reads:
+            page, source = reads.popleft()
+            prefetch()
+            page_html = render(page, source.result())
+            writer.pending.put((page, page[1], page_html))
+            yield from writer.completed()
+        yield from writer.finish()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        writer.abort()
@@ -0,0 +1,136 @@
+import json, os, time, tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+import block_markdown
+
+# Parser functions timed as sub-phases of "parse", looked up by name in
+# block_markdown so the wrappers are only installed while profiling.
+PARSE_HOOKS = {
+    "markdown_to_blocks": "block split",
+    "block_to_block_type": "classify",
+    "text_to_textnodes": "inline",
+}
+
+
+_active_profiler = None
+
+
+def active_profiler():
+    return _active_profiler
+
+
+def set_active_profiler(profiler):
+    global _active_profiler
+    _active_profiler = profiler
+
+
+def profile_phase(name):
+    # A shared no-op context when profiling is off.
+    if _active_profiler is None:
+        return nullcontext()
+    return _active_profiler.phase(name)
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    scale = 1 if os.uname().sysname == "Darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class BuildProfiler:
+    def __init__(self):
+        self.phases = {}
+        self.pages = []
+        self.current_page = None
+        self.originals = {}
+        self.started = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        tracemalloc.start()
+        for name, phase in PARSE_HOOKS.items():
+            original = getattr(block_markdown, name)
+            self.originals[name] = original
+            setattr(block_markdown, name, self.timed(original, phase))
+
+    def stop(self):
+        for name, original in self.originals.items():
+            setattr(block_markdown, name, original)
+        self.originals = {}
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def timed(self, function, phase):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter() - started)
+        return wrapper
+
+    def add(self, phase, seconds, peak_bytes=0):
+        for phases in (self.phases, self.current_page["phases"] if self.current_page else None):
+            if phases is None:
+                continue
+            entry = phases.setdefault(phase, {"seconds": 0.0, "peak_bytes": 0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["peak_bytes"] = max(entry["peak_bytes"], peak_bytes)
+            entry["calls"] += 1
+
+    @contextmanager
+    def phase(self, name):
+        current = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] - current if tracemalloc.is_tracing() else 0
+            self.add(name, seconds, peak)
+
+    @contextmanager
+    def page(self, source):
+        self.current_page = {"source": str(source), "seconds": 0.0, "phases": {}}
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current_page["seconds"] = time.perf_counter() - started
+            self.pages.append(self.current_page)
+            self.current_page = None
+
+    def report(self):
+        return {
+            "wall_seconds": time.perf_counter() - self.started if self.started else 0.0,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "phases": self.phases,
+            "pages": sorted(self.pages, key=lambda page: page["seconds"], reverse=True),
+        }
+
+    def write(self, path):
+        path = Path(path)
+        os.makedirs(path.parent, exist_ok=True)
+        with open(path, "w") as report_stream:
+            json.dump(self.report(), report_stream, indent=2)
+
+    def summary(self, slowest=10):
+        report = self.report()
+        lines = [f"Build profile: {report['wall_seconds'] * 1000:.1f} ms wall, {len(self.pages)} pages"]
+        for name, entry in self.phases.items():
+            lines.append(
+                f"  {name:<14} {entry['seconds'] * 1000:10.1f} ms"
+                f"  peak {entry['peak_bytes'] / 1024:10.1f} KiB  calls {entry['calls']}"
+            )
+        if self.pages:
+            lines.append("Slowest pages:")
+            for page in report["pages"][:slowest]:
+                lines.append(f"  {page['seconds'] * 1000:10.1f} ms  {page['source']}")
+        return "\n".join(lines)
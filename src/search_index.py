@@ -0,0 +1,270 @@
+import json, os, shutil
+from pathlib import Path
+
+SEARCH_DIR = "search"
+SEARCH_FORMAT = 1
+STORE_FORMAT = 2
+PAGE_BLOCK = 64
+PREFIX_LENGTH = 2
+
+# Output layout, under docs/search/:
+#   index.json    {"format", "prefix_length", "pages": [[url, title], ...],
+#                 "shards": [name, ...]}; pages is indexed by document id,
+#                 with null for ids not in use.
+#   <shard>.json  {"terms": [term, ...], "postings": [[...], ...]} for every
+#                 term whose first prefix_length characters give the shard
+#                 name. Terms are sorted, and postings[i] belongs to
+#                 terms[i] as a flat list of (document id delta, count)
+#                 pairs in ascending document order.
+# A prefix that is not plain ASCII letters and digits is named "_" plus
+# the hex of its UTF-8 bytes.
+
+
+def shard_name(term):
+    prefix = term[:PREFIX_LENGTH]
+    if prefix.isascii() and prefix.isalnum():
+        return prefix
+    return "_" + prefix.encode().hex()
+
+
+def encode_postings(postings):
+    encoded = []
+    previous = 0
+    for doc_id, count in postings:
+        encoded.append(doc_id - previous)
+        encoded.append(count)
+        previous = doc_id
+    return encoded
+
+
+def decode_postings(encoded):
+    postings = []
+    doc_id = 0
+    for i in range(0, len(encoded), 2):
+        doc_id += encoded[i]
+        postings.append((doc_id, encoded[i + 1]))
+    return postings
+
+
+def dump_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def replace_file(path, text):
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "w", encoding="utf-8") as stream:
+        stream.write(text)
+    os.replace(temp_path, path)
+
+
+def write_if_changed(path, text):
+    try:
+        with open(path, encoding="utf-8") as stream:
+            if stream.read() == text:
+                return False
+    except OSError:
+        pass
+    replace_file(path, text)
+    return True
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as stream:
+        return json.load(stream)
+
+
+class SearchIndex:
+    # The index as of the last build, kept in a .build-cache directory from
+    # which docs/search/ is written. Only pages whose source changed are
+    # re-read, and only shards holding a term whose postings changed are
+    # rebuilt. Document ids are stable, and freed ids are reused, so one
+    # changed page does not renumber every posting list.
+    #
+    # Store layout, under path:
+    #   store.json           {"format"}
+    #   pages/<block>.json   {id: {"key", "source", "url", "title"}}
+    #   terms/<block>.json   {id: {term: count}}
+    #   shards/<shard>.json  the shard as written to docs/search/
+    # where block is the document id divided by PAGE_BLOCK. Page records
+    # are all read on load; term counts only for the blocks of pages that
+    # change, and shards only when one of their terms changes.
+    def __init__(self, path):
+        self.path = Path(path)
+        self.pages = {}
+        self.keys = {}
+        self.ids = set()
+        self.next_id = 0
+        self.term_blocks = {}
+        self.changed_blocks = set()
+        # term -> {document id: new count, or None once it is gone}
+        self.changed_postings = {}
+        self.dirty = False
+
+    def load(self):
+        try:
+            data = read_json(self.path / "store.json")
+            if not isinstance(data, dict) or data.get("format") != STORE_FORMAT:
+                raise ValueError("unknown search store format")
+            for name in os.listdir(self.path / "pages"):
+                for doc_id, page in read_json(self.path / "pages" / name).items():
+                    self.add_page(page["key"], int(doc_id), page["source"], page["url"], page["title"])
+        except (OSError, ValueError, KeyError):
+            # Whatever is there cannot be trusted: start from an empty store.
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.pages = {}
+            self.keys = {}
+            self.ids = set()
+            return False
+        return True
+
+    def save(self):
+        if not self.dirty:
+            return
+        for directory in ("pages", "terms"):
+            os.makedirs(self.path / directory, exist_ok=True)
+        if not (self.path / "store.json").exists():
+            replace_file(self.path / "store.json", dump_json({"format": STORE_FORMAT}))
+        for block in sorted(self.changed_blocks):
+            pages = {}
+            for doc_id in range(block * PAGE_BLOCK, (block + 1) * PAGE_BLOCK):
+                key = self.keys.get(doc_id)
+                if key is not None:
+                    page = self.pages[key]
+                    pages[doc_id] = {"key": key, "source": page["source"], "url": page["url"], "title": page["title"]}
+            self.save_block(self.path / "pages" / f"{block}.json", pages)
+            self.save_block(self.path / "terms" / f"{block}.json", self.term_blocks[block])
+        self.changed_blocks.clear()
+        self.dirty = False
+
+    def save_block(self, path, entries):
+        if entries:
+            replace_file(path, dump_json({str(doc_id): entry for doc_id, entry in entries.items()}))
+        elif path.exists():
+            os.unlink(path)
+
+    def add_page(self, key, doc_id, source_hash, url, title):
+        self.pages[key] = {"id": doc_id, "source": source_hash, "url": url, "title": title}
+        self.keys[doc_id] = key
+        self.ids.add(doc_id)
+
+    def block_terms(self, doc_id):
+        # The term counts of every page in doc_id's block, read on first use.
+        block = doc_id // PAGE_BLOCK
+        terms = self.term_blocks.get(block)
+        if terms is None:
+            try:
+                stored = read_json(self.path / "terms" / f"{block}.json")
+            except OSError:
+                stored = {}
+            terms = self.term_blocks[block] = {int(stored_id): counts for stored_id, counts in stored.items()}
+        return terms
+
+    def set_terms(self, doc_id, terms):
+        block_terms = self.block_terms(doc_id)
+        old_terms = block_terms.pop(doc_id, {})
+        for term, count in terms.items():
+            if old_terms.get(term) != count:
+                self.changed_postings.setdefault(term, {})[doc_id] = count
+        for term in old_terms:
+            if term not in terms:
+                self.changed_postings.setdefault(term, {})[doc_id] = None
+        if terms:
+            block_terms[doc_id] = terms
+        self.changed_blocks.add(doc_id // PAGE_BLOCK)
+        self.dirty = True
+
+    def is_current(self, key, source_hash):
+        page = self.pages.get(key)
+        return page is not None and page["source"] == source_hash
+
+    def allocate_id(self):
+        while self.next_id in self.ids:
+            self.next_id += 1
+        return self.next_id
+
+    def update(self, key, source_hash, url, title, terms):
+        old = self.pages.get(key)
+        doc_id = self.allocate_id() if old is None else old["id"]
+        self.add_page(key, doc_id, source_hash, url, title)
+        self.set_terms(doc_id, terms)
+
+    def remove(self, key):
+        page = self.pages.pop(key, None)
+        if page is None:
+            return
+        doc_id = page["id"]
+        del self.keys[doc_id]
+        self.ids.discard(doc_id)
+        self.next_id = min(self.next_id, doc_id)
+        self.set_terms(doc_id, {})
+
+    def prune(self, live_keys):
+        live_keys = set(live_keys)
+        for key in [key for key in self.pages if key not in live_keys]:
+            self.remove(key)
+
+    def write(self, dest_dir):
+        # Returns the output paths relative to dest_dir, and how many
+        # shards were rewritten.
+        search_dir = Path(dest_dir) / SEARCH_DIR
+        shard_dir = self.path / "shards"
+        os.makedirs(search_dir, exist_ok=True)
+        os.makedirs(shard_dir, exist_ok=True)
+        changes = {}
+        for term, postings in self.changed_postings.items():
+            changes.setdefault(shard_name(term), {})[term] = postings
+
+        written = 0
+        for name, shard_changes in sorted(changes.items()):
+            shard_path = shard_dir / f"{name}.json"
+            try:
+                shard = read_json(shard_path)
+                terms = {term: dict(decode_postings(postings)) for term, postings in zip(shard["terms"], shard["postings"])}
+            except OSError:
+                terms = {}
+            for term, postings in shard_changes.items():
+                counts = terms.setdefault(term, {})
+                for doc_id, count in postings.items():
+                    if count is None:
+                        counts.pop(doc_id, None)
+                    else:
+                        counts[doc_id] = count
+                if not counts:
+                    del terms[term]
+            if not terms:
+                for path in (shard_path, search_dir / f"{name}.json"):
+                    if path.exists():
+                        os.unlink(path)
+                continue
+            sorted_terms = sorted(terms)
+            text = dump_json({
+                "terms": sorted_terms,
+                "postings": [encode_postings(sorted(terms[term].items())) for term in sorted_terms],
+            })
+            replace_file(shard_path, text)
+            written += write_if_changed(search_dir / f"{name}.json", text)
+        self.changed_postings.clear()
+
+        names = sorted(name[:-len(".json")] for name in os.listdir(shard_dir) if name.endswith(".json"))
+        for name in names:
+            # A shard missing from docs/, say after --clean, is written out
+            # even if none of its terms changed.
+            if name not in changes and not (search_dir / f"{name}.json").exists():
+                with open(shard_dir / f"{name}.json", encoding="utf-8") as stream:
+                    written += write_if_changed(search_dir / f"{name}.json", stream.read())
+
+        table = [None] * (max(self.keys) + 1 if self.keys else 0)
+        for doc_id, key in self.keys.items():
+            page = self.pages[key]
+            table[doc_id] = [page["url"], page["title"]]
+        index = {
+            "format": SEARCH_FORMAT,
+            "prefix_length": PREFIX_LENGTH,
+            "pages": table,
+            "shards": names,
+        }
+        write_if_changed(search_dir / "index.json", dump_json(index))
+
+        outputs = {f"{SEARCH_DIR}/index.json"}
+        outputs.update(f"{SEARCH_DIR}/{name}.json" for name in names)
+        return outputs, written
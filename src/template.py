@@ -0,0 +1,99 @@
+import os, re
+from pathlib import Path
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+LAYOUT_NAME = "template.html"
+
+
+def rewrite_root_urls(html, base_path):
+    # Only applied once, to the template's own markup; page content resolves
+    # its URLs while it is rendered (see HTMLNode.props_to_html).
+    if base_path == "/":
+        return html
+    html = html.replace('href="/', f'href="{base_path}')
+    return html.replace('src="/', f'src="{base_path}')
+
+
+class Template:
+    def __init__(self, text, base_path="/"):
+        self.base_path = base_path
+        # segments[i] is the static text before slots[i]; the last segment
+        # follows the final slot.
+        self.segments = []
+        self.slots = []
+        position = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self.segments.append(rewrite_root_urls(text[position:match.start()], base_path))
+            self.slots.append((match.group(1), match.group(0)))
+            position = match.end()
+        self.segments.append(rewrite_root_urls(text[position:], base_path))
+
+    def render(self, **values):
+        return "".join(self.iter_render(**values))
+
+    def iter_render(self, **values):
+        # Slot values may be strings or iterables of HTML fragments, such as
+        # HTMLNode.iter_html(), which are passed through without joining.
+        yield self.segments[0]
+        for (name, placeholder), segment in zip(self.slots, self.segments[1:]):
+            value = values.get(name)
+            if value is None:
+                yield placeholder
+            elif isinstance(value, str):
+                yield value
+            else:
+                yield from value
+            yield segment
+
+    def write(self, stream, **values):
+        stream.writelines(self.iter_render(**values))
+
+
+class TemplateCache:
+    def __init__(self, base_path="/"):
+        self.base_path = base_path
+        self.templates = {}
+        self.layouts = {}
+
+    def get(self, path):
+        path = Path(path)
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self.templates.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        with open(path) as template_stream:
+            template = Template(template_stream.read(), self.base_path)
+        self.templates[path] = (key, template)
+        return template
+
+    def find_layout(self, source_path, content_root, default_path):
+        # A section can override the site template by placing its own
+        # template.html next to its pages; the nearest one wins. Results
+        # are cached per directory, and directories are compared as plain
+        # strings, since this runs for every page of every build.
+        directory = os.path.dirname(source_path)
+        layout = self.layouts.get(directory)
+        if layout is None:
+            content_root = os.fspath(content_root)
+            if directory != content_root and not directory.startswith(content_root + os.sep):
+                layout = Path(default_path)
+            elif os.path.isfile(os.path.join(directory, LAYOUT_NAME)):
+                layout = Path(directory, LAYOUT_NAME)
+            elif directory == content_root:
+                layout = Path(default_path)
+            else:
+                layout = self.find_layout(directory, content_root, default_path)
+            self.layouts[directory] = layout
+        return layout
+
+
+_caches = {}
+
+
+def load_template(path, base_path="/"):
+    cache = _caches.get(base_path)
+    if cache is None:
+        cache = _caches[base_path] = TemplateCache(base_path)
+    return cache.get(path)
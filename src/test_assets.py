@@ -0,0 +1,162 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+import assets
+from assets import materialize_file, sync_directory
+
+
+class TestSyncDirectory(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.source = self.root / "static"
+        self.target = self.root / "docs"
+        (self.source / "images").mkdir(parents=True)
+        (self.source / "index.css").write_text("body {}")
+        (self.source / "images" / "a.png").write_bytes(b"png")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_initial_sync_copies_everything(self):
+        self.assertEqual(sync_directory(self.source, self.target), (2, 0))
+        self.assertEqual((self.target / "index.css").read_text(), "body {}")
+        self.assertEqual((self.target / "images" / "a.png").read_bytes(), b"png")
+
+    def test_unchanged_files_are_not_copied(self):
+        sync_directory(self.source, self.target)
+        self.assertEqual(sync_directory(self.source, self.target), (0, 0))
+
+    def test_changed_file_is_copied(self):
+        sync_directory(self.source, self.target)
+        (self.source / "index.css").write_text("body { margin: 0 }")
+        self.assertEqual(sync_directory(self.source, self.target), (1, 0))
+        self.assertEqual((self.target / "index.css").read_text(), "body { margin: 0 }")
+
+    def test_checksum_skips_touched_but_identical_file(self):
+        sync_directory(self.source, self.target)
+        stat = os.stat(self.source / "index.css")
+        os.utime(self.source / "index.css", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(sync_directory(self.source, self.target, checksum=True), (0, 0))
+        self.assertEqual(sync_directory(self.source, self.target), (1, 0))
+
+    def test_stale_files_are_removed(self):
+        sync_directory(self.source, self.target)
+        os.unlink(self.source / "images" / "a.png")
+        self.assertEqual(sync_directory(self.source, self.target), (0, 1))
+        self.assertFalse((self.target / "images" / "a.png").exists())
+
+    def test_stale_directories_are_pruned(self):
+        sync_directory(self.source, self.target)
+        os.unlink(self.source / "images" / "a.png")
+        os.rmdir(self.source / "images")
+        sync_directory(self.source, self.target)
+        self.assertFalse((self.target / "images").exists())
+
+    def test_kept_files_survive(self):
+        (self.target / "blog").mkdir(parents=True)
+        (self.target / "blog" / "index.html").write_text("page")
+        sync_directory(self.source, self.target, keep={"blog/index.html"})
+        self.assertEqual((self.target / "blog" / "index.html").read_text(), "page")
+
+    def test_kept_files_are_not_overwritten_by_static(self):
+        (self.source / "index.html").write_text("static")
+        self.target.mkdir()
+        (self.target / "index.html").write_text("page")
+        sync_directory(self.source, self.target, keep={"index.html"})
+        self.assertEqual((self.target / "index.html").read_text(), "page")
+
+    def test_copy_replaces_links_from_an_earlier_strategy(self):
+        for strategy in ("symlink", "hardlink"):
+            with self.subTest(strategy=strategy):
+                target = self.root / strategy
+                sync_directory(self.source, target, strategy=strategy)
+                self.assertEqual(sync_directory(self.source, target, strategy=strategy), (0, 0))
+                self.assertEqual(sync_directory(self.source, target, checksum=True), (2, 0))
+                self.assertFalse((target / "index.css").is_symlink())
+                self.assertEqual(os.stat(target / "index.css").st_nlink, 1)
+                self.assertEqual(sync_directory(self.source, target), (0, 0))
+
+    def test_unchanged_state_skips_target_scan(self):
+        state = {}
+        self.assertEqual(sync_directory(self.source, self.target, keep={"index.html"}, state=state), (2, 0))
+        self.assertEqual(state["strategy"], "copy")
+        with mock.patch("assets.scan_files", wraps=assets.scan_files) as scan:
+            self.assertEqual(sync_directory(self.source, self.target, keep={"index.html"}, state=state), (0, 0))
+        self.assertEqual(scan.call_count, 1)
+
+        # A deleted target, another keep set or another strategy means a
+        # full sync.
+        os.unlink(self.target / "index.css")
+        self.assertEqual(sync_directory(self.source, self.target, keep={"index.html"}, state=state), (1, 0))
+        (self.target / "stale.html").write_text("old page")
+        self.assertEqual(sync_directory(self.source, self.target, state=state), (0, 1))
+        with mock.patch("assets.scan_files", wraps=assets.scan_files) as scan:
+            self.assertEqual(sync_directory(self.source, self.target, strategy="hardlink", state=state), (0, 0))
+        self.assertEqual(scan.call_count, 2)
+        self.assertEqual(state["strategy"], "hardlink")
+
+    def test_missing_source_removes_everything(self):
+        sync_directory(self.source, self.target)
+        self.assertEqual(sync_directory(self.root / "missing", self.target), (0, 2))
+
+
+class TestMaterializeFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.source = self.root / "source.png"
+        self.source.write_bytes(b"image data")
+        self.target = self.root / "target.png"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_copy(self):
+        self.assertEqual(materialize_file(self.source, self.target), "copy")
+        self.assertEqual(self.target.read_bytes(), b"image data")
+        self.assertEqual(os.stat(self.target).st_mtime_ns, os.stat(self.source).st_mtime_ns)
+
+    def test_hardlink(self):
+        self.assertEqual(materialize_file(self.source, self.target, "hardlink"), "hardlink")
+        self.assertTrue(os.path.samefile(self.source, self.target))
+
+    def test_symlink(self):
+        self.assertEqual(materialize_file(self.source, self.target, "symlink"), "symlink")
+        self.assertTrue(self.target.is_symlink())
+        self.assertEqual(self.target.read_bytes(), b"image data")
+
+    def test_reflink_produces_identical_file(self):
+        self.assertIn(materialize_file(self.source, self.target, "reflink"), ("reflink", "copy"))
+        self.assertFalse(self.target.is_symlink())
+        self.assertEqual(self.target.read_bytes(), b"image data")
+        self.assertEqual(os.stat(self.target).st_mtime_ns, os.stat(self.source).st_mtime_ns)
+
+    def test_replacing_a_hardlink_does_not_touch_source(self):
+        materialize_file(self.source, self.target, "hardlink")
+        other = self.root / "other.png"
+        other.write_bytes(b"other")
+        materialize_file(other, self.target)
+        self.assertEqual(self.source.read_bytes(), b"image data")
+        self.assertEqual(self.target.read_bytes(), b"other")
+
+    def test_failed_link_falls_back_to_copy(self):
+        with mock.patch("assets.os.link", side_effect=OSError("cross-device link")):
+            self.assertEqual(materialize_file(self.source, self.target, "hardlink"), "copy")
+        self.assertFalse(os.path.samefile(self.source, self.target))
+        self.assertEqual(self.target.read_bytes(), b"image data")
+
+    def test_sync_with_worker_pool(self):
+        source = self.root / "static"
+        source.mkdir()
+        for i in range(20):
+            (source / f"{i}.txt").write_text(str(i))
+        self.assertEqual(sync_directory(source, self.root / "docs", workers=4), (20, 0))
+        self.assertEqual((self.root / "docs" / "7.txt").read_text(), "7")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from block_markdown import DocumentSummary, iter_markdown_html, markdown_to_blocks, markdown_to_html_node, parse_document
+from fragment_cache import FragmentCache
+from htmlnode import RawHTMLNode
+from inline_markdown import set_inline_engine
+
+
+MARKDOWN = "# Title\n\nSome **bold** text\n\n- one\n- two\n\n```\ncode\n```"
+
+
+class TestFragmentCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "fragments.sqlite3"
+
+    def tearDown(self):
+        set_inline_engine("multi-pass")
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        cache = FragmentCache(self.path)
+        self.assertIsNone(cache.get("block"))
+        cache.put("block", "<p>block</p>")
+        self.assertEqual(cache.get("block"), "<p>block</p>")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.close()
+
+    def test_persists_across_instances(self):
+        cache = FragmentCache(self.path)
+        cache.put("block", "<p>block</p>")
+        cache.close()
+        self.assertEqual(FragmentCache(self.path).get("block"), "<p>block</p>")
+
+    def test_key_depends_on_inline_engine(self):
+        cache = FragmentCache(self.path)
+        cache.put("block", "<p>block</p>")
+        set_inline_engine("single-pass")
+        self.assertIsNone(cache.get("block"))
+        cache.close()
+
+    def test_key_depends_on_base_path(self):
+        cache = FragmentCache(self.path)
+        cache.put("[a](/x)", '<p><a href="/site/x">a</a></p>', "/site/")
+        self.assertIsNone(cache.get("[a](/x)"))
+        self.assertEqual(cache.get("[a](/x)", "/site/"), '<p><a href="/site/x">a</a></p>')
+        cache.close()
+
+    def test_markdown_to_html_node_uses_cache(self):
+        cache = FragmentCache(self.path)
+        expected = markdown_to_html_node(MARKDOWN).to_html()
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache).to_html(), expected)
+        self.assertEqual(cache.misses, 4)
+        node = markdown_to_html_node(MARKDOWN, cache)
+        self.assertEqual(node.to_html(), expected)
+        self.assertIsInstance(node.children[0], RawHTMLNode)
+        self.assertEqual(cache.hits, 4)
+        cache.close()
+
+    def test_iter_markdown_html_uses_cache(self):
+        cache = FragmentCache(self.path)
+        blocks = markdown_to_blocks(MARKDOWN)
+        expected = markdown_to_html_node(MARKDOWN).to_html()
+        self.assertEqual("".join(iter_markdown_html(blocks, cache)), expected)
+        self.assertEqual("".join(iter_markdown_html(blocks, cache)), expected)
+        self.assertEqual((cache.hits, cache.misses), (4, 4))
+        cache.close()
+
+    def test_summary_survives_cache_hits(self):
+        cache = FragmentCache(self.path)
+        _, expected = parse_document(MARKDOWN)
+        parse_document(MARKDOWN, cache)
+        _, summary = parse_document(MARKDOWN, cache)
+        self.assertEqual(summary, expected)
+        self.assertEqual((cache.hits, cache.misses), (4, 4))
+        cache.close()
+
+    def test_terms_survive_cache_hits(self):
+        cache = FragmentCache(self.path)
+        _, expected = parse_document(MARKDOWN, summary=DocumentSummary(terms={}))
+        parse_document(MARKDOWN, cache)
+        _, summary = parse_document(MARKDOWN, cache, summary=DocumentSummary(terms={}))
+        self.assertEqual(summary.terms, expected.terms)
+        self.assertEqual(cache.hits, 4)
+        cache.close()
+
+    def test_fragment_without_summary_is_a_miss_for_summaries(self):
+        cache = FragmentCache(self.path)
+        cache.put("block", "<p>block</p>")
+        self.assertIsNone(cache.lookup("block", need_summary=True))
+        self.assertEqual(cache.lookup("block"), ("<p>block</p>", None))
+        cache.close()
+
+    def test_eviction_drops_least_recently_used(self):
+        cache = FragmentCache(self.path, max_bytes=250)
+        for i in range(2):
+            cache.put(f"block {i}", "x" * 100)
+            cache.flush()
+        cache.get("block 0")
+        cache.flush()
+        cache.put("block 2", "x" * 100)
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNotNone(cache.get("block 0"))
+        self.assertIsNone(cache.get("block 1"))
+        self.assertIsNotNone(cache.get("block 2"))
+        self.assertEqual(cache.stats()["bytes"], 200)
+        cache.close()
+
+    def test_flush_enforces_the_size_bound(self):
+        cache = FragmentCache(self.path, max_bytes=250)
+        for i in range(5):
+            cache.put(f"block {i}", "x" * 100)
+            cache.flush()
+            self.assertLessEqual(cache.stats()["bytes"], 250)
+        self.assertIsNotNone(cache.get("block 4"))
+        self.assertIsNone(cache.get("block 0"))
+        cache.close()
+
+    def test_stats_include_workers(self):
+        cache = FragmentCache(self.path)
+        cache.get("block")
+        cache.merge_stats(101, 3, 1)
+        cache.merge_stats(102, 2, 2)
+        cache.merge_stats(101, 4, 1)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (6, 4))
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
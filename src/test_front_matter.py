@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import front_matter
+from front_matter import MetadataIndex, read_front_matter, skip_front_matter, strip_front_matter
+
+
+HEADER = "---\ntitle: Hello: world\ndate: 2024-01-02\ntags: [a, b]\ndescription: \"quoted\"\n---\n"
+
+
+class TestFrontMatter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "index.md"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_fields(self):
+        self.path.write_text(HEADER + "# Title")
+        self.assertEqual(
+            read_front_matter(self.path),
+            {"title": "Hello: world", "date": "2024-01-02", "tags": ["a", "b"], "description": "quoted"},
+        )
+
+    def test_single_tag_is_a_list(self):
+        self.path.write_text("---\ntags: solo\n---\n")
+        self.assertEqual(read_front_matter(self.path), {"tags": ["solo"]})
+
+    def test_brackets_only_make_lists_of_list_fields(self):
+        self.path.write_text("---\ntitle: [draft] Notes\nsummary: [a, b]\ntags: [a, b]\n---\n")
+        self.assertEqual(
+            read_front_matter(self.path),
+            {"title": "[draft] Notes", "summary": "[a, b]", "tags": ["a", "b"]},
+        )
+
+    def test_no_front_matter(self):
+        self.path.write_text("# Title\n\n---\n")
+        self.assertEqual(read_front_matter(self.path), {})
+        self.assertEqual(strip_front_matter("# Title\n\n---\n"), "# Title\n\n---\n")
+
+    def test_unclosed_header_is_body(self):
+        text = "---\ntitle: x\n\n# Title"
+        self.assertEqual(strip_front_matter(text), text)
+        self.assertEqual("".join(skip_front_matter(text.splitlines(keepends=True))), text)
+
+    def test_strip(self):
+        self.assertEqual(strip_front_matter(HEADER + "# Title"), "# Title")
+        self.assertEqual("".join(skip_front_matter((HEADER + "# Title").splitlines(keepends=True))), "# Title")
+
+    def test_reads_header_only(self):
+        # The body is not valid UTF-8, so decoding it would fail.
+        with open(self.path, "wb") as stream:
+            stream.write(HEADER.encode() + b"\xff" * (1 << 20))
+        self.assertEqual(read_front_matter(self.path)["date"], "2024-01-02")
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.page = self.root / "index.md"
+        self.page.write_text(HEADER)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_reuses_entries_across_instances(self):
+        index = MetadataIndex(self.root / "metadata.json")
+        self.assertEqual(index.get(self.page, "index.md")["tags"], ["a", "b"])
+        index.save()
+
+        index = MetadataIndex(self.root / "metadata.json")
+        self.assertTrue(index.load())
+        with mock.patch.object(front_matter, "read_front_matter", side_effect=AssertionError("read")):
+            self.assertEqual(index.get(self.page, "index.md")["date"], "2024-01-02")
+        self.assertEqual((index.hits, index.misses), (1, 0))
+
+    def test_ignores_entries_from_another_format(self):
+        (self.root / "metadata.json").write_text('{"index.md": [0, 0, {"title": ["draft"]}]}')
+        self.assertFalse(MetadataIndex(self.root / "metadata.json").load())
+
+    def test_rereads_changed_files(self):
+        index = MetadataIndex(self.root / "metadata.json")
+        index.get(self.page, "index.md")
+        self.page.write_text("---\ndate: 2025-05-05\n---\n")
+        stat = os.stat(self.page)
+        os.utime(self.page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertEqual(index.get(self.page, "index.md"), {"date": "2025-05-05"})
+
+    def test_prune(self):
+        index = MetadataIndex(self.root / "metadata.json")
+        index.get(self.page, "index.md")
+        self.assertEqual(index.prune(["other.md"]), ["index.md"])
+        self.assertEqual(index.entries, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
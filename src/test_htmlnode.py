@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, RawHTMLNode, escape_attribute, escape_html
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -191,6 +192,115 @@ class TestHTMLNode(unittest.TestCase):
             "<div><p>child 1</p><span><h1><b>great grandchild</b></h1></span><b>child 3</b></div>",
         )
 
+    def test_nodes_are_slotted(self):
+        for node in (HTMLNode(), LeafNode("b", "x"), ParentNode("p", [LeafNode("b", "x")])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_tags_are_interned(self):
+        tag = "".join(["sp", "an"])
+        self.assertIs(LeafNode(tag, "x").tag, LeafNode("span", "y").tag)
+
+    def test_iter_html_yields_fragments(self):
+        node = ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")])
+        self.assertEqual(list(node.iter_html()), ["<p>", "<b>Bold</b>", " text", "</p>"])
+
+    def test_write_html(self):
+        node = ParentNode("div", [ParentNode("span", [LeafNode("b", "grandchild")])])
+        stream = io.StringIO()
+        node.write_html(stream)
+        self.assertEqual(stream.getvalue(), node.to_html())
+
+    def test_deeply_nested_to_html(self):
+        node = LeafNode("b", "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * 5000 + "<b>deep</b>"))
+        self.assertTrue(html.endswith("</span>" * 5000))
+
+    def test_nested_invalid_child_raises(self):
+        node = ParentNode("div", [ParentNode("ul", [])])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+    def test_escape_html(self):
+        self.assertEqual(escape_html('a < b && c > "d"'), 'a &lt; b &amp;&amp; c &gt; "d"')
+        self.assertEqual(escape_attribute('say "hi" & <go>'), "say &quot;hi&quot; &amp; &lt;go&gt;")
+
+    def test_escape_html_returns_clean_text_unchanged(self):
+        text = "".join(["plain ", "text"])
+        self.assertIs(escape_html(text), text)
+        self.assertIs(escape_attribute(text), text)
+
+    def test_leaf_values_are_escaped(self):
+        self.assertEqual(LeafNode(None, "1 < 2 & 3").to_html(), "1 &lt; 2 &amp; 3")
+        self.assertEqual(LeafNode("code", "<script>").to_html(), "<code>&lt;script&gt;</code>")
+
+    def test_prop_values_are_escaped(self):
+        node = LeafNode("img", "", {"src": "/a.png?x=1&y=2", "alt": 'a "quoted" <alt>'})
+        self.assertEqual(
+            node.to_html(),
+            '<img src="/a.png?x=1&amp;y=2" alt="a &quot;quoted&quot; &lt;alt&gt;"></img>',
+        )
+
+    def test_raw_html_is_not_escaped(self):
+        node = ParentNode("div", [RawHTMLNode("<p>&amp; done</p>")])
+        self.assertEqual(node.to_html(), "<div><p>&amp; done</p></div>")
+
+    def test_equal_trees_hash_equal(self):
+        first = ParentNode("p", [LeafNode("b", "x"), LeafNode(None, "y")], {"class": "a", "id": "b"})
+        second = ParentNode("p", [LeafNode("b", "x"), LeafNode(None, "y")], {"id": "b", "class": "a"})
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertEqual(len({first, second}), 1)
+
+    def test_hash_is_cached(self):
+        node = ParentNode("p", [LeafNode("b", "x")])
+        self.assertIsNone(node._hash)
+        value = hash(node)
+        self.assertEqual(node._hash, value)
+        self.assertIsNotNone(node.children[0]._hash)
+
+    def test_different_values_are_not_equal(self):
+        self.assertNotEqual(LeafNode("b", "x"), LeafNode("b", "y"))
+        self.assertNotEqual(ParentNode("p", [LeafNode("b", "x")]), ParentNode("p", [LeafNode("b", "y")]))
+        self.assertNotEqual(ParentNode("p", []), ParentNode("p", [LeafNode("b", "x")]))
+        self.assertNotEqual(LeafNode("b", "x"), LeafNode("b", "x", {}))
+
+    def test_deep_trees_compare_without_recursion(self):
+        first = LeafNode("b", "deep")
+        second = LeafNode("b", "deep")
+        for _ in range(5000):
+            first = ParentNode("span", [first])
+            second = ParentNode("span", [second])
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+
+    def test_node_class_is_part_of_equality(self):
+        leaf = LeafNode(None, "<b>")
+        raw = RawHTMLNode("<b>")
+        self.assertNotEqual(leaf, raw)
+        self.assertNotEqual(hash(leaf), hash(raw))
+        self.assertEqual(len({leaf, raw, LeafNode(None, "<b>")}), 2)
+
+    def test_root_urls_resolve_against_base_path(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "home", {"href": "/"}),
+                LeafNode("img", "", {"src": "/images/a.png", "alt": "/not/a/url"}),
+                LeafNode("a", "cdn", {"href": "//cdn.example.com/x"}),
+                LeafNode("a", "away", {"href": "https://example.com/"}),
+            ],
+        )
+        self.assertEqual(
+            node.to_html("/site/"),
+            '<p><a href="/site/">home</a><img src="/site/images/a.png" alt="/not/a/url"></img>'
+            '<a href="//cdn.example.com/x">cdn</a><a href="https://example.com/">away</a></p>',
+        )
+        self.assertEqual(node.to_html(), "".join(node.iter_html("/")))
+        self.assertIn('href="/"', node.to_html())
+
 
 if __name__ == "__main__":
     unittest.main()
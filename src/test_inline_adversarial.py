@@ -0,0 +1,102 @@
+import unittest
+from contextlib import ExitStack
+from unittest import mock
+
+import inline_markdown
+from inline_markdown import INLINE_ENGINES, set_inline_engine, text_to_textnodes
+
+# Pathological inline inputs, each built from a repeat count n. A parser that
+# is linear in the input size does about four times as much work at 4n as
+# at n.
+ADVERSARIAL_INPUTS = {
+    "star run": lambda n: "*" * (2 * n),
+    "underscore run": lambda n: "_" * (2 * n),
+    "backtick run": lambda n: "`" * (2 * n),
+    "alternating delimiters": lambda n: "*_" * n + "_*" * n,
+    "unclosed bold": lambda n: "a ** b " * n + "**",
+    "open brackets": lambda n: "[" * n,
+    "close brackets": lambda n: "]" * n,
+    "open parentheses": lambda n: "(" * n,
+    "image openers": lambda n: "![" * n,
+    "image bangs": lambda n: "!" * n + "[a](b)",
+    "nested brackets": lambda n: "[" * n + "a" + "]" * n + "(u)",
+    "unclosed links": lambda n: "[a](" * n,
+    "unclosed images": lambda n: "![a](" * n,
+    "link text without url": lambda n: "[a]" * n,
+    "brackets inside url": lambda n: "[a](" + "[]" * n,
+    "long unclosed link text": lambda n: ("[" + "a" * 20) * n,
+    "many links": lambda n: "[a](b)" * n,
+    "many images": lambda n: "![a](b)" * n,
+    "dense markup": lambda n: "**b** _i_ `c` [l](u) ![i](u) " * n,
+}
+
+SMALL = 250
+LARGE = 4 * SMALL
+# Work that grows linearly in n; a little slack for the fixed cost of each
+# parse.
+SLACK = 8
+PATTERN_NAMES = ("INLINE_OPENER", "IMAGE_PATTERN", "LINK_PATTERN", "BARE_LINK_PATTERN")
+
+
+class CountingPattern:
+    # Stands in for a compiled pattern and counts the scans made with it.
+    # Every pattern stops at the next bracket, parenthesis or opener, so a
+    # parser is linear when the number of scans and of nodes it produces is.
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.scans = 0
+
+    def search(self, *args):
+        self.scans += 1
+        return self.pattern.search(*args)
+
+    def match(self, *args):
+        self.scans += 1
+        return self.pattern.match(*args)
+
+    def finditer(self, *args):
+        self.scans += 1
+        for match in self.pattern.finditer(*args):
+            self.scans += 1
+            yield match
+
+
+def parse_steps(text):
+    patterns = {name: CountingPattern(getattr(inline_markdown, name)) for name in PATTERN_NAMES}
+    with ExitStack() as stack:
+        for name, pattern in patterns.items():
+            stack.enter_context(mock.patch.object(inline_markdown, name, pattern))
+        try:
+            nodes = len(text_to_textnodes(text))
+        except Exception as error:
+            if str(error) != "A closing delimiter is missing":
+                raise
+            nodes = 0
+    return nodes + sum(pattern.scans for pattern in patterns.values())
+
+
+class TestAdversarialInlineInputs(unittest.TestCase):
+    def tearDown(self):
+        set_inline_engine("multi-pass")
+
+    def test_inputs_parse_in_linear_steps(self):
+        # Wall-clock timings are left to bench/bench_inline_adversarial.py;
+        # counted steps do not depend on how busy the machine is.
+        for engine in INLINE_ENGINES:
+            set_inline_engine(engine)
+            for name, build in ADVERSARIAL_INPUTS.items():
+                with self.subTest(engine=engine, input=name):
+                    small = parse_steps(build(SMALL))
+                    large = parse_steps(build(LARGE))
+                    self.assertLessEqual(large, LARGE // SMALL * small + SLACK)
+
+    def test_long_delimiter_runs_do_not_recurse(self):
+        for engine in INLINE_ENGINES:
+            set_inline_engine(engine)
+            with self.subTest(engine=engine):
+                nodes = text_to_textnodes("a" + "**b**" * 50000)
+                self.assertEqual(len(nodes), 50001)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from listing import listing_entry, listing_pages, page_url, slugify
+
+
+def entries(*pages):
+    return [listing_entry(key, metadata) for key, metadata in pages]
+
+
+class TestListing(unittest.TestCase):
+    def test_page_url(self):
+        self.assertEqual(page_url("blog/post/index.md"), "/blog/post/")
+        self.assertEqual(page_url("index.md"), "/")
+
+    def test_slugify(self):
+        self.assertEqual(slugify("Middle Earth & Co."), "middle-earth-co")
+
+    def test_drafts_are_left_out(self):
+        self.assertIsNone(listing_entry("blog/a/index.md", {"draft": "true"}))
+
+    def test_sorted_newest_first_and_paginated(self):
+        pages = list(listing_pages("blog", entries(
+            ("blog/a/index.md", {"date": "2024-01-01"}),
+            ("blog/b/index.md", {"date": "2024-03-01"}),
+            ("blog/c/index.md", {}),
+            ("blog/d/index.md", {"date": "2024-02-01", "draft": "yes"}),
+        ), per_page=2))
+        self.assertEqual([page[0] for page in pages], ["blog", "blog/page/2"])
+        first = pages[0][2].to_html()
+        self.assertLess(first.index('href="/blog/b/"'), first.index('href="/blog/a/"'))
+        self.assertIn('<a href="/blog/page/2/" rel="next">Older</a>', first)
+        self.assertEqual(pages[1][1], "Blog (page 2)")
+        self.assertIn('href="/blog/c/"', pages[1][2].to_html())
+        self.assertIn('<a href="/blog/" rel="prev">Newer</a>', pages[1][2].to_html())
+
+    def test_tag_pages(self):
+        pages = list(listing_pages("blog", entries(
+            ("blog/a/index.md", {"title": "A <1>", "tags": ["Deep Lore"]}),
+            ("blog/b/index.md", {"tags": ["deep lore", "other"]}),
+        )))
+        self.assertEqual([page[0] for page in pages], ["blog", "blog/tags/deep-lore", "blog/tags/other"])
+        tag_page = pages[1][2].to_html()
+        self.assertIn("A &lt;1&gt;", tag_page)
+        self.assertIn('href="/blog/b/"', tag_page)
+
+    def test_empty_section(self):
+        pages = list(listing_pages("blog", []))
+        self.assertEqual(len(pages), 1)
+        self.assertIn("Nothing here yet.", pages[0][2].to_html())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,311 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from assets import sync_directory
+from fragment_cache import FragmentCache
+from inline_markdown import disable_inline_cache, enable_inline_cache, inline_cache_info
+from main import BuildOptions, PageBuildError, generate_all_pages, generate_page, main, make_rebuilder, parse_args
+from manifest import BuildManifest
+
+
+TEMPLATE = '<title>{{ Title }}</title><link href="/index.css"><main>{{ Content }}</main>'
+
+
+class TestParseArgs(unittest.TestCase):
+    def test_asset_workers_must_be_positive(self):
+        self.assertEqual(parse_args(["--asset-workers", "2"]).asset_workers, 2)
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["--asset-workers", "0"])
+
+
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.content = self.root / "content"
+        self.template = self.root / "template.html"
+        self.template.write_text(TEMPLATE)
+        for i in range(8):
+            page_dir = self.content / "posts" / f"post-{i}"
+            page_dir.mkdir(parents=True)
+            (page_dir / "index.md").write_text(
+                f"# Post {i}\n\nSome **bold** text and a [link](/posts/post-{i})\n\n- one\n- two"
+            )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_tree(self, root):
+        return {
+            path.relative_to(root).as_posix(): path.read_bytes()
+            for path in sorted(root.rglob("*"))
+            if path.is_file()
+        }
+
+    def test_parallel_output_matches_serial(self):
+        serial = self.root / "serial"
+        parallel = self.root / "parallel"
+        generate_all_pages(self.content, self.template, serial, BuildOptions("/site/"))
+        generate_all_pages(self.content, self.template, parallel, BuildOptions("/site/", jobs=3))
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+        self.assertEqual(len(self.read_tree(parallel)), 8)
+
+    def test_pipeline_output_matches_serial(self):
+        serial = self.root / "serial"
+        pipelined = self.root / "pipelined"
+        generate_all_pages(self.content, self.template, serial, BuildOptions("/site/"))
+        generate_all_pages(self.content, self.template, pipelined, BuildOptions("/site/", pipeline=True))
+        self.assertEqual(self.read_tree(serial), self.read_tree(pipelined))
+
+    def test_pipeline_keeps_fragments_of_pages_before_a_failure(self):
+        (self.content / "posts" / "post-7" / "index.md").write_text("No title here")
+        cache = FragmentCache(self.root / "fragments.sqlite3")
+        with self.assertRaises(ValueError):
+            generate_all_pages(self.content, self.template, self.root / "docs", BuildOptions(pipeline=True, fragment_cache=cache))
+        reopened = FragmentCache(self.root / "fragments.sqlite3")
+        self.assertGreater(reopened.stats()["entries"], 0)
+        reopened.close()
+        cache.close()
+
+    def test_base_path_leaves_code_text_alone(self):
+        (self.content / "posts" / "post-0" / "index.md").write_text(
+            '# Post\n\n[link](/posts/)\n\n```\n<a href="/raw">\n```'
+        )
+        generate_all_pages(self.content, self.template, self.root / "docs", BuildOptions("/site/"))
+        page = (self.root / "docs" / "posts" / "post-0" / "index.html").read_text()
+        self.assertIn('<link href="/site/index.css">', page)
+        self.assertIn('<a href="/site/posts/">link</a>', page)
+        self.assertIn('&lt;a href="/raw"&gt;', page)
+
+    def test_parallel_fragment_cache_stats_include_workers(self):
+        cache = FragmentCache(self.root / "fragments.sqlite3")
+        generate_all_pages(self.content, self.template, self.root / "docs", BuildOptions(jobs=2, fragment_cache=cache))
+        generate_all_pages(self.content, self.template, self.root / "again", BuildOptions(jobs=2, fragment_cache=cache))
+        stats = cache.stats()
+        cache.close()
+        # Three blocks per page; the second build hits every one.
+        self.assertEqual(stats["hits"] + stats["misses"], 2 * 8 * 3)
+        self.assertGreaterEqual(stats["hits"], 8 * 3)
+
+    def test_parallel_inline_cache_stats_include_workers(self):
+        enable_inline_cache(64)
+        try:
+            generate_all_pages(self.content, self.template, self.root / "docs", BuildOptions(jobs=2))
+            info = inline_cache_info()
+        finally:
+            disable_inline_cache()
+        # Every page parses its heading, paragraph and two list items.
+        self.assertEqual(info.hits + info.misses, 8 * 4)
+        self.assertGreater(info.hits, 0)
+
+    def test_parallel_error_reports_source_path(self):
+        broken = self.content / "posts" / "post-3" / "index.md"
+        broken.write_text("no title here")
+        with self.assertRaises(PageBuildError) as context:
+            generate_all_pages(self.content, self.template, self.root / "docs", BuildOptions(jobs=2))
+        self.assertEqual(context.exception.source_path, str(broken))
+        self.assertIn("markdown does not contain a title", str(context.exception))
+
+    def test_section_layout(self):
+        (self.content / "posts" / "template.html").write_text("<article>{{ Content }}</article>")
+        (self.content / "index.md").write_text("# Home")
+        generate_all_pages(self.content, self.template, self.root / "docs")
+        self.assertEqual(
+            (self.root / "docs" / "posts" / "post-0" / "index.html").read_text()[:14],
+            "<article><div>",
+        )
+        self.assertTrue((self.root / "docs" / "index.html").read_text().startswith("<title>Home"))
+
+    def test_failed_page_leaves_no_partial_output(self):
+        docs = self.root / "docs"
+        generate_all_pages(self.content, self.template, docs)
+        page = docs / "posts" / "post-0" / "index.html"
+        before = page.read_text()
+        (self.content / "posts" / "post-0" / "index.md").write_text("# Post\n\n- a\n- \n- b")
+        with self.assertRaises(ValueError):
+            generate_page(self.content / "posts" / "post-0" / "index.md", self.template, page.parent, "/")
+        self.assertEqual(page.read_text(), before)
+        self.assertEqual(sorted(path.name for path in page.parent.iterdir()), ["index.html"])
+
+
+class TestWatchRebuild(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.content = self.root / "content"
+        self.static = self.root / "static"
+        self.docs = self.root / "docs"
+        self.template = self.root / "template.html"
+        (self.content / "blog").mkdir(parents=True)
+        self.static.mkdir()
+        self.template.write_text(TEMPLATE)
+        (self.content / "index.md").write_text("# Home")
+        (self.content / "blog" / "index.md").write_text("# Blog")
+        (self.static / "index.css").write_text("body {}")
+        self.manifest = BuildManifest(self.root / "manifest.json")
+        options = BuildOptions("/", self.manifest)
+        outputs = generate_all_pages(self.content, self.template, self.docs, options)
+        sync_directory(self.static, self.docs, keep=outputs)
+        self.rebuild = make_rebuilder(self.content, self.static, self.template, self.docs, options, outputs)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_changed_page_is_rebuilt_alone(self):
+        (self.docs / "blog" / "index.html").write_text("untouched")
+        (self.content / "index.md").write_text("# Welcome")
+        self.rebuild({self.content / "index.md"}, set())
+        self.assertIn("<title>Welcome</title>", (self.docs / "index.html").read_text())
+        self.assertEqual((self.docs / "blog" / "index.html").read_text(), "untouched")
+
+    def test_removed_page_output_is_deleted(self):
+        os.unlink(self.content / "blog" / "index.md")
+        self.rebuild(set(), {self.content / "blog" / "index.md"})
+        self.assertFalse((self.docs / "blog").exists())
+        self.assertNotIn("blog/index.md", self.manifest.pages)
+
+    def test_template_change_rebuilds_pages(self):
+        self.template.write_text("<body>{{ Content }}</body>")
+        self.rebuild({self.template}, set())
+        self.assertTrue((self.docs / "index.html").read_text().startswith("<body>"))
+        self.assertTrue((self.docs / "blog" / "index.html").read_text().startswith("<body>"))
+
+    def test_static_changes_are_synced(self):
+        (self.static / "index.css").write_text("body { margin: 0 }")
+        (self.static / "app.js").write_text("run()")
+        self.rebuild({self.static / "index.css", self.static / "app.js"}, set())
+        self.assertEqual((self.docs / "index.css").read_text(), "body { margin: 0 }")
+        self.assertEqual((self.docs / "app.js").read_text(), "run()")
+        os.unlink(self.static / "app.js")
+        self.rebuild(set(), {self.static / "app.js"})
+        self.assertFalse((self.docs / "app.js").exists())
+
+    def test_failed_rebuild_keeps_watching(self):
+        (self.content / "index.md").write_text("no title")
+        self.rebuild({self.content / "index.md"}, set())
+        (self.content / "index.md").write_text("# Fixed")
+        self.rebuild({self.content / "index.md"}, set())
+        self.assertIn("<title>Fixed</title>", (self.docs / "index.html").read_text())
+
+
+class TestSiteRoot(unittest.TestCase):
+    def test_builds_site_under_root(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "content").mkdir()
+            (root / "static").mkdir()
+            (root / "template.html").write_text(TEMPLATE)
+            (root / "content" / "index.md").write_text("# Home")
+            (root / "static" / "index.css").write_text("body {}")
+            main(["--root", str(root)])
+            self.assertIn("<title>Home</title>", (root / "docs" / "index.html").read_text())
+            self.assertEqual((root / "docs" / "index.css").read_text(), "body {}")
+            self.assertTrue((root / ".build-cache" / "manifest.json").exists())
+
+    def test_title_is_escaped(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "content").mkdir()
+            (root / "static").mkdir()
+            (root / "template.html").write_text(TEMPLATE)
+            (root / "content" / "index.md").write_text("# Fish & <Chips>")
+            main(["--root", str(root)])
+            page = (root / "docs" / "index.html").read_text()
+            self.assertIn("<title>Fish &amp; &lt;Chips&gt;</title>", page)
+            self.assertIn("<h1>Fish &amp; &lt;Chips&gt;</h1>", page)
+
+
+class TestListings(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        (self.root / "static").mkdir()
+        (self.root / "template.html").write_text(TEMPLATE)
+        for name, date, tags in (("a", "2024-01-01", "x"), ("b", "2024-02-01", "x, y"), ("c", "2023-06-01", "y")):
+            page_dir = self.root / "content" / "blog" / name
+            page_dir.mkdir(parents=True)
+            (page_dir / "index.md").write_text(f"---\ntitle: Post {name}\ndate: {date}\ntags: {tags}\n---\n# Post {name}")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_listing_pages_and_stripped_front_matter(self):
+        main(["--root", str(self.root), "--listing", "blog", "--per-page", "2"])
+        docs = self.root / "docs"
+        first = (docs / "blog" / "index.html").read_text()
+        self.assertLess(first.index("Post b"), first.index("Post a"))
+        self.assertNotIn("Post c", first)
+        self.assertIn('href="/blog/page/2/"', first)
+        self.assertIn("Post c", (docs / "blog" / "page" / "2" / "index.html").read_text())
+        self.assertIn("Post c", (docs / "blog" / "tags" / "y" / "index.html").read_text())
+        self.assertEqual(
+            (docs / "blog" / "a" / "index.html").read_text(),
+            "<title>Post a</title><link href=\"/index.css\"><main><div><h1>Post a</h1></div></main>",
+        )
+
+    def test_stale_tag_pages_are_removed(self):
+        main(["--root", str(self.root), "--listing", "blog"])
+        (self.root / "content" / "blog" / "c" / "index.md").write_text("# Post c")
+        (self.root / "content" / "blog" / "b" / "index.md").write_text("---\ntags: x\n---\n# Post b")
+        main(["--root", str(self.root), "--listing", "blog"])
+        self.assertFalse((self.root / "docs" / "blog" / "tags" / "y").exists())
+        self.assertTrue((self.root / "docs" / "blog" / "tags" / "x" / "index.html").exists())
+
+    def test_listing_is_merged_into_section_index(self):
+        (self.root / "content" / "blog" / "index.md").write_text("---\ntitle: Blog\n---\n# My blog\n\nHello.")
+        main(["--root", str(self.root), "--listing", "blog", "--per-page", "2"])
+        first = (self.root / "docs" / "blog" / "index.html").read_text()
+        self.assertTrue(first.startswith("<title>My blog</title>"))
+        self.assertLess(first.index("<p>Hello.</p>"), first.index("Post b"))
+        self.assertNotIn('href="/blog/"', first)
+        self.assertIn('href="/blog/page/2/"', first)
+        main(["--root", str(self.root), "--listing", "blog", "--per-page", "2"])
+        self.assertEqual((self.root / "docs" / "blog" / "index.html").read_text(), first)
+
+    def test_listing_cannot_overwrite_a_page(self):
+        (self.root / "content" / "blog" / "about.md").write_text("# About")
+        with self.assertRaises(ValueError):
+            main(["--root", str(self.root), "--listing", "blog"])
+
+
+class TestSearchBuild(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        (self.root / "static").mkdir()
+        (self.root / "template.html").write_text(TEMPLATE)
+        for i in range(4):
+            page_dir = self.root / "content" / f"page-{i}"
+            page_dir.mkdir(parents=True)
+            (page_dir / "index.md").write_text(f"# Page {i}\n\nShared words and **word{i}**")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def search_files(self):
+        search_dir = self.root / "docs" / "search"
+        return {path.name: path.read_text() for path in search_dir.iterdir()}
+
+    def test_parallel_and_pipeline_match_serial(self):
+        main(["--root", str(self.root), "--search", "--clean"])
+        expected = self.search_files()
+        self.assertIn("wo.json", expected)
+        main(["--root", str(self.root), "--search", "--clean", "-j", "2"])
+        self.assertEqual(self.search_files(), expected)
+        main(["--root", str(self.root), "--search", "--clean", "--pipeline", "--fragment-cache"])
+        self.assertEqual(self.search_files(), expected)
+
+    def test_enabling_search_indexes_current_pages(self):
+        main(["--root", str(self.root), "--tree-cache"])
+        main(["--root", str(self.root), "--search", "--tree-cache"])
+        self.assertIn("word3", self.search_files()["wo.json"])
+        main(["--root", str(self.root)])
+        self.assertFalse((self.root / "docs" / "search").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from main import BuildOptions, generate_all_pages
+from manifest import BuildManifest, hash_file
+
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_file_hash_matches_content_hash(self):
+        path = self.root / "page.md"
+        path.write_text("# Title")
+        manifest = BuildManifest(self.root / "manifest.json")
+        self.assertEqual(manifest.file_hash(path), hash_file(path))
+
+    def test_file_hash_reuses_unchanged_stat(self):
+        path = self.root / "page.md"
+        path.write_text("# Title")
+        manifest = BuildManifest(self.root / "manifest.json")
+        manifest.file_hash(path)
+        stat = os.stat(path)
+        manifest.files[str(path)][2] = "cached"
+        self.assertEqual(manifest.file_hash(path), "cached")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertEqual(manifest.file_hash(path), hash_file(path))
+
+    def test_round_trip(self):
+        path = self.root / "manifest.json"
+        manifest = BuildManifest(path, {"base_path": "/"})
+        manifest.record("index.md", "index.md", "abc", "def", "index.html")
+        manifest.save()
+        loaded = BuildManifest(path, {"base_path": "/"})
+        self.assertTrue(loaded.load())
+        self.assertEqual(loaded.pages, manifest.pages)
+
+    def test_config_change_invalidates(self):
+        path = self.root / "manifest.json"
+        manifest = BuildManifest(path, {"base_path": "/"})
+        manifest.record("index.md", "index.md", "abc", "def", "index.html")
+        manifest.save()
+        self.assertFalse(BuildManifest(path, {"base_path": "/site/"}).load())
+
+    def test_missing_manifest(self):
+        self.assertFalse(BuildManifest(self.root / "missing.json").load())
+
+    def saved_manifest(self, pages=20):
+        path = self.root / "manifest.json"
+        manifest = BuildManifest(path, {"base_path": "/"})
+        for number in range(pages):
+            manifest.record(f"{number}.md", f"{number}.md", "abc", "def", f"{number}/index.html")
+        manifest.save()
+        return manifest
+
+    def reload(self, manifest):
+        loaded = BuildManifest(manifest.path, {"base_path": "/"})
+        self.assertTrue(loaded.load())
+        return loaded
+
+    def test_small_changes_are_appended_to_the_journal(self):
+        manifest = self.saved_manifest()
+        written = manifest.path.read_bytes()
+        manifest.record("0.md", "0.md", "changed", "def", "0/index.html")
+        manifest.remove_page("1.md")
+        manifest.record_static({"strategy": "copy"})
+        manifest.save()
+        self.assertEqual(manifest.path.read_bytes(), written)
+        self.assertEqual(len(manifest.journal_path.read_text().splitlines()), 5)
+
+        loaded = self.reload(manifest)
+        self.assertEqual(loaded.pages, manifest.pages)
+        self.assertEqual(loaded.files, manifest.files)
+        self.assertEqual(loaded.static, {"strategy": "copy"})
+
+        # Saving from the loaded manifest keeps appending to the same journal.
+        loaded.record("2.md", "2.md", "changed", "def", "2/index.html")
+        loaded.save()
+        self.assertEqual(self.reload(manifest).pages["2.md"]["source"], "changed")
+
+    def test_journal_is_folded_in_once_it_outgrows_the_manifest(self):
+        manifest = self.saved_manifest()
+        written = manifest.path.read_bytes()
+        for _ in range(20):
+            manifest.record("0.md", "0.md", "changed", "def", "0/index.html")
+            manifest.save()
+        self.assertNotEqual(manifest.path.read_bytes(), written)
+        self.assertLess(manifest.journal_size, manifest.manifest_size // 2)
+        self.assertEqual(self.reload(manifest).pages, manifest.pages)
+
+    def test_interrupted_journal_entry_is_dropped(self):
+        manifest = self.saved_manifest()
+        manifest.record("0.md", "0.md", "changed", "def", "0/index.html")
+        manifest.save()
+        with open(manifest.journal_path, "a") as journal_stream:
+            journal_stream.write('["pages", "1.md", {"source"')
+        loaded = self.reload(manifest)
+        self.assertEqual(loaded.pages["0.md"]["source"], "changed")
+        self.assertEqual(loaded.pages["1.md"]["source"], "abc")
+
+        # The next save rewrites the manifest and starts a clean journal.
+        loaded.record("2.md", "2.md", "changed", "def", "2/index.html")
+        loaded.save()
+        self.assertEqual(len(loaded.journal_path.read_text().splitlines()), 1)
+        self.assertEqual(self.reload(manifest).pages, loaded.pages)
+
+    def test_journal_of_another_manifest_is_ignored(self):
+        manifest = self.saved_manifest()
+        journal = manifest.journal_path.read_text()
+        manifest.record("0.md", "0.md", "changed", "def", "0/index.html")
+        manifest.rewrite()
+        manifest.journal_path.write_text(journal + '["pages", "0.md", null]\n')
+        self.assertEqual(self.reload(manifest).pages["0.md"]["source"], "changed")
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.content = self.root / "content"
+        self.docs = self.root / "docs"
+        self.template = self.root / "template.html"
+        (self.content / "blog" / "post").mkdir(parents=True)
+        (self.content / "index.md").write_text("# Home\n\nWelcome")
+        (self.content / "blog" / "post" / "index.md").write_text("# Post\n\nBody")
+        self.template.write_text(TEMPLATE)
+        self.manifest_path = self.root / "cache" / "manifest.json"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def build(self):
+        manifest = BuildManifest(self.manifest_path, {"base_path": "/"})
+        manifest.load()
+        generate_all_pages(self.content, self.template, self.docs, BuildOptions("/", manifest))
+        manifest.save()
+
+    def mark_outputs(self):
+        for output in (self.docs / "index.html", self.docs / "blog" / "post" / "index.html"):
+            output.write_text("untouched")
+
+    def test_first_build_writes_pages(self):
+        self.build()
+        self.assertEqual(
+            (self.docs / "index.html").read_text(),
+            "<title>Home</title><main><div><h1>Home</h1><p>Welcome</p></div></main>",
+        )
+        self.assertTrue((self.docs / "blog" / "post" / "index.html").exists())
+
+    def test_noop_build_skips_pages(self):
+        self.build()
+        self.mark_outputs()
+        self.build()
+        self.assertEqual((self.docs / "index.html").read_text(), "untouched")
+        self.assertEqual((self.docs / "blog" / "post" / "index.html").read_text(), "untouched")
+
+    def test_changed_source_is_rebuilt(self):
+        self.build()
+        self.mark_outputs()
+        (self.content / "index.md").write_text("# Home\n\nWelcome back")
+        self.build()
+        self.assertIn("Welcome back", (self.docs / "index.html").read_text())
+        self.assertEqual((self.docs / "blog" / "post" / "index.html").read_text(), "untouched")
+
+    def test_changed_template_rebuilds_everything(self):
+        self.build()
+        self.mark_outputs()
+        self.template.write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        self.assertTrue((self.docs / "index.html").read_text().startswith("<h1>Home</h1>"))
+        self.assertTrue((self.docs / "blog" / "post" / "index.html").read_text().startswith("<h1>Post</h1>"))
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.unlink(self.docs / "index.html")
+        self.build()
+        self.assertTrue((self.docs / "index.html").exists())
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        os.unlink(self.content / "blog" / "post" / "index.md")
+        self.build()
+        self.assertFalse((self.docs / "blog").exists())
+        self.assertTrue((self.docs / "index.html").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
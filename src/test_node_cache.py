@@ -0,0 +1,109 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import main
+from block_markdown import markdown_to_html_node
+from htmlnode import LeafNode, ParentNode, RawHTMLNode
+from inline_markdown import set_inline_engine
+from node_cache import TreeCache, dump_tree, load_tree
+
+
+MARKDOWN = (
+    "# Title\n\nSome **bold** text with a [link](/docs) and ![alt](/img.png)\n\n"
+    "- one\n- two\n\n> quoted\n\n```\ncode\n```"
+)
+
+
+class TestTreeSerialization(unittest.TestCase):
+    def test_round_trip(self):
+        tree = markdown_to_html_node(MARKDOWN)
+        loaded, title = load_tree(dump_tree(tree, "Title"))
+        self.assertEqual(title, "Title")
+        self.assertEqual(loaded.to_html(), tree.to_html())
+        self.assertEqual(repr(loaded), repr(tree))
+
+    def test_node_kinds_and_props(self):
+        tree = ParentNode(
+            "div",
+            [
+                LeafNode(None, "plain"),
+                LeafNode("img", "", {"src": "/a.png", "alt": ""}),
+                RawHTMLNode("<p>raw</p>"),
+                ParentNode("ul", [LeafNode("li", "é ✓")], {}),
+            ],
+        )
+        loaded, title = load_tree(dump_tree(tree))
+        self.assertIsNone(title)
+        self.assertIsInstance(loaded.children[2], RawHTMLNode)
+        self.assertIsNone(loaded.children[0].tag)
+        self.assertEqual(loaded.children[1].props, {"src": "/a.png", "alt": ""})
+        self.assertEqual(loaded.children[3].props, {})
+        self.assertEqual(loaded.to_html(), tree.to_html())
+
+    def test_strings_are_stored_once(self):
+        small = dump_tree(markdown_to_html_node("# T\n\n" + "**bold** " * 10))
+        large = dump_tree(markdown_to_html_node("# T\n\n" + "**bold** " * 1000))
+        self.assertLess(len(large) - len(small), 1000 * 2 * 5 * 4)
+
+    def test_rejects_corrupt_data(self):
+        data = dump_tree(markdown_to_html_node(MARKDOWN), "Title")
+        for corrupt in (b"", b"XXXX" + data[4:], data[:-4], data[:-1]):
+            with self.assertRaises(ValueError):
+                load_tree(corrupt)
+
+
+class TestTreeCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        set_inline_engine("multi-pass")
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        cache = TreeCache(self.root / "trees")
+        self.assertIsNone(cache.get("abc"))
+        cache.put("abc", markdown_to_html_node(MARKDOWN), "Title")
+        node, title = cache.get("abc")
+        self.assertEqual(title, "Title")
+        self.assertEqual(node.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_key_depends_on_inline_engine(self):
+        cache = TreeCache(self.root / "trees")
+        cache.put("abc", markdown_to_html_node(MARKDOWN), "Title")
+        set_inline_engine("single-pass")
+        self.assertIsNone(cache.get("abc"))
+
+    def test_prune_keeps_live_trees(self):
+        cache = TreeCache(self.root / "trees")
+        cache.put("live", markdown_to_html_node(MARKDOWN), "Title")
+        cache.put("stale", markdown_to_html_node(MARKDOWN), "Title")
+        self.assertEqual(cache.prune(["live"]), 1)
+        self.assertIsNotNone(cache.get("live"))
+        self.assertIsNone(cache.get("stale"))
+
+    def test_template_change_renders_without_parsing(self):
+        content = self.root / "content"
+        content.mkdir()
+        (content / "index.md").write_text(MARKDOWN)
+        template = self.root / "template.html"
+        template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        docs = self.root / "docs"
+        cache = TreeCache(self.root / "trees")
+        manifest = main.BuildManifest(self.root / "manifest.json")
+        main.generate_all_pages(content, template, docs, main.BuildOptions("/", manifest, tree_cache=cache))
+        first = (docs / "index.html").read_text()
+
+        template.write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        with mock.patch("main.parse_document", side_effect=AssertionError("parsed")):
+            main.generate_all_pages(content, template, docs, main.BuildOptions("/", manifest, tree_cache=cache))
+        second = (docs / "index.html").read_text()
+        self.assertEqual(second.replace("<h1>", "<title>", 1).replace("</h1>", "</title>", 1), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pipeline
+from pipeline import pipeline_pages
+
+
+def render_upper(page, source):
+    return source.upper()
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.pages = []
+        for i in range(40):
+            source = self.root / "content" / f"page-{i}.md"
+            source.parent.mkdir(exist_ok=True)
+            source.write_text(f"page {i}")
+            self.pages.append((source, self.root / "docs" / f"page-{i}"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_pages_are_written_and_yielded_in_order(self):
+        done = list(pipeline_pages(self.pages, render_upper, readers=3, depth=4, batch_size=3))
+        self.assertEqual(done, self.pages)
+        for i, (_, dest_dir) in enumerate(self.pages):
+            self.assertEqual((dest_dir / "index.html").read_text(), f"PAGE {i}")
+
+    def test_each_directory_is_created_once(self):
+        (self.root / "docs").mkdir()
+        self.pages.append((self.pages[0][0], self.pages[0][1]))
+        with mock.patch.object(pipeline.os, "makedirs", wraps=pipeline.os.makedirs) as makedirs:
+            list(pipeline_pages(self.pages, render_upper, batch_size=4))
+        self.assertEqual(makedirs.call_count, len(self.pages) - 1)
+
+    def test_reads_stay_within_depth(self):
+        started = []
+        rendered = []
+
+        def read(path):
+            started.append(path)
+            return Path(path).read_text()
+
+        def render(page, source):
+            rendered.append(page)
+            self.assertLessEqual(len(started), len(rendered) + 4)
+            return source
+
+        with mock.patch.object(pipeline, "read_source", side_effect=read):
+            list(pipeline_pages(self.pages, render, readers=2, depth=4))
+        self.assertEqual(len(started), len(self.pages))
+
+    def test_read_error_stops_the_build(self):
+        self.pages[5][0].unlink()
+        with self.assertRaises(FileNotFoundError):
+            list(pipeline_pages(self.pages, render_upper, depth=4))
+        self.assertFalse((self.pages[-1][1] / "index.html").exists())
+
+    def test_render_error_stops_the_build(self):
+        def render(page, source):
+            if source == "page 7":
+                raise ValueError("bad page")
+            return source
+
+        with self.assertRaises(ValueError):
+            list(pipeline_pages(self.pages, render, depth=4))
+        self.assertTrue((self.pages[6][1] / "index.html").exists())
+        self.assertFalse((self.pages[7][1] / "index.html").exists())
+
+    def test_write_error_is_raised(self):
+        (self.root / "docs").mkdir()
+        (self.root / "docs" / "page-3").write_text("not a directory")
+        with self.assertRaises(OSError):
+            list(pipeline_pages(self.pages, render_upper, depth=4))
+        self.assertFalse((self.pages[-1][1] / "index.html").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
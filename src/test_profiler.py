@@ -0,0 +1,66 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import block_markdown
+from main import generate_page
+from profiler import BuildProfiler, active_profiler, profile_phase, set_active_profiler
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.profiler = BuildProfiler()
+
+    def tearDown(self):
+        set_active_profiler(None)
+        self.profiler.stop()
+        self.temp_dir.cleanup()
+
+    def test_inactive_phase_is_a_no_op(self):
+        self.assertIsNone(active_profiler())
+        with profile_phase("clear"):
+            pass
+        self.assertEqual(self.profiler.phases, {})
+
+    def test_parser_hooks_are_installed_and_removed(self):
+        original = block_markdown.block_to_block_type
+        self.profiler.start()
+        self.assertIsNot(block_markdown.block_to_block_type, original)
+        block_markdown.markdown_to_html_node("# Title\n\nSome **text**")
+        self.assertEqual(self.profiler.phases["classify"]["calls"], 2)
+        self.assertEqual(self.profiler.phases["inline"]["calls"], 2)
+        self.profiler.stop()
+        self.assertIs(block_markdown.block_to_block_type, original)
+
+    def test_page_phases_and_report(self):
+        content = self.root / "index.md"
+        content.write_text("# Title\n\nSome **text**")
+        template = self.root / "template.html"
+        template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        self.profiler.start()
+        set_active_profiler(self.profiler)
+        generate_page(content, template, self.root / "docs", "/")
+        set_active_profiler(None)
+        self.profiler.stop()
+
+        self.assertEqual(
+            (self.root / "docs" / "index.html").read_text(),
+            "<title>Title</title><div><h1>Title</h1><p>Some <b>text</b></p></div>",
+        )
+        page = self.profiler.pages[0]
+        self.assertEqual(page["source"], str(content))
+        for phase in ("template load", "read", "parse", "block split", "classify", "inline", "render", "write"):
+            self.assertIn(phase, page["phases"])
+
+        report_path = self.root / "profile.json"
+        self.profiler.write(report_path)
+        report = json.loads(report_path.read_text())
+        self.assertEqual(report["pages"][0]["source"], str(content))
+        self.assertIn(str(content), self.profiler.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,19 @@
+import io
 import unittest
 import unittest.util
 
-from block_markdown import BlockType, markdown_to_blocks, block_to_block_type, markdown_to_html_node, extract_title
+from block_markdown import (
+    BlockType,
+    markdown_to_blocks,
+    iter_markdown_blocks,
+    iter_markdown_html,
+    block_to_block_type,
+    classify_blocks,
+    markdown_to_html_node,
+    extract_title,
+    DocumentSummary,
+    parse_document,
+)
 from htmlnode import HTMLNode, ParentNode, LeafNode
 
 unittest.util._MAX_LENGTH = 2000
@@ -88,6 +100,46 @@ This is the same paragraph on a new line
             ]
         )
 
+class TestIterMarkdownBlocks(unittest.TestCase):
+    samples = [
+        "",
+        "\n\n\n",
+        "# Title\n\nParagraph one\nstill one\n\n\n\n- a\n- b\n",
+        "   indented start\n\n\n  after three newlines",
+        "a\n  \nb\n\n \n\nc",
+        "trailing block without newline",
+        "```\ncode\n\nwith blank line\n```",
+    ]
+
+    def test_matches_markdown_to_blocks(self):
+        for markdown in self.samples:
+            with self.subTest(markdown=markdown):
+                self.assertEqual(
+                    list(iter_markdown_blocks(io.StringIO(markdown))),
+                    markdown_to_blocks(markdown),
+                )
+
+    def test_yields_blocks_before_reading_the_rest(self):
+        def lines():
+            yield "first block\n"
+            yield "\n"
+            raise AssertionError("read too far")
+
+        blocks = iter_markdown_blocks(lines())
+        self.assertEqual(next(blocks), "first block")
+
+    def test_iter_markdown_html_matches_tree(self):
+        markdown = "# Title\n\nSome **bold** text\n\n- a\n- b\n\n> quote"
+        self.assertEqual(
+            "".join(iter_markdown_html(markdown_to_blocks(markdown))),
+            markdown_to_html_node(markdown).to_html(),
+        )
+
+    def test_iter_markdown_html_requires_blocks(self):
+        with self.assertRaises(ValueError):
+            list(iter_markdown_html([]))
+
+
 class TestMarkdownExtractTitle(unittest.TestCase):
     def test_extract_title_standard(self):
         title = extract_title("# This is a heading")
@@ -212,6 +264,29 @@ class TestMarkdownBlockToBlockNode(unittest.TestCase):
         block_type = block_to_block_type("1 This is an ordered list")
         self.assertEqual(block_type, BlockType.PARAGRAPH)
 
+    def test_long_ordered_list_block_to_block_node(self):
+        block = "\n".join(f"{i}. item" for i in range(1, 1001))
+        self.assertEqual(block_to_block_type(block), BlockType.ORDERED_LIST)
+        self.assertEqual(block_to_block_type(block + "\n1002. item"), BlockType.PARAGRAPH)
+
+    def test_mixed_list_lines_block_to_block_node(self):
+        self.assertEqual(block_to_block_type("- one\n* two"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("> one\ntwo"), BlockType.PARAGRAPH)
+
+    def test_classify_blocks(self):
+        blocks = ["# Title", "```\ncode\n```", "> quote", "- item", "1. item", "text"]
+        self.assertEqual(
+            classify_blocks(blocks),
+            [
+                BlockType.HEADING,
+                BlockType.CODE,
+                BlockType.QUOTE,
+                BlockType.UNORDERED_LIST,
+                BlockType.ORDERED_LIST,
+                BlockType.PARAGRAPH,
+            ],
+        )
+
         
 class TestMarkdownBlockToHTMLNode(unittest.TestCase):
     def test_paragraph_markdown_to_html_node(self):
@@ -226,7 +301,7 @@ class TestMarkdownBlockToHTMLNode(unittest.TestCase):
 
     def test_code_markdown_to_html_node(self):
         block = markdown_to_html_node("```\nThis is **bolded** code\nIt countains multiple lines\n```")
-        parent_node = ParentNode("div", [ParentNode("pre", [ParentNode("code", [LeafNode(None,"This is **bolded** code\nIt countains multiple lines")])])])
+        parent_node = ParentNode("div", [ParentNode("pre", [ParentNode("code", [LeafNode(None,"This is **bolded** code\nIt countains multiple lines\n")])])])
         self.assertEqual(block, parent_node)
         
     def test_quote_markdown_to_html_node(self):
@@ -356,4 +431,77 @@ the **same** even with inline stuff
         self.assertEqual(
             html,
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
-        )
\ No newline at end of file
+        )
+
+    def test_code_is_escaped(self):
+        md = """
+```
+if a < b && b > c:
+    print("<done>")
+```
+"""
+
+        node = markdown_to_html_node(md)
+        self.assertEqual(
+            node.to_html(),
+            '<div><pre><code>if a &lt; b &amp;&amp; b &gt; c:\n    print("&lt;done&gt;")\n</code></pre></div>',
+        )
+
+    def test_text_and_alt_text_are_escaped(self):
+        node = markdown_to_html_node('[< Back](/) & ![a "b" <c>](/c.png)')
+        self.assertEqual(
+            node.to_html(),
+            '<div><p><a href="/">&lt; Back</a> &amp; <img src="/c.png" alt="a &quot;b&quot; &lt;c&gt;"></img></p></div>',
+        )
+
+
+
+SUMMARY_MARKDOWN = """Intro with a # Title in it
+
+## Section **one**
+
+Read [the docs](/docs) and [more](https://example.com) ![alt words](/a.png)
+
+```
+code words here
+```
+
+- item [x](/x)
+1. not a list"""
+
+
+class TestDocumentSummary(unittest.TestCase):
+    def test_summary_collected_with_tree(self):
+        node, summary = parse_document(SUMMARY_MARKDOWN)
+        self.assertEqual(node, markdown_to_html_node(SUMMARY_MARKDOWN))
+        self.assertEqual(summary.title, extract_title(SUMMARY_MARKDOWN))
+        self.assertEqual(summary.headings, [(2, "Section one")])
+        self.assertEqual(summary.links, ["/docs", "https://example.com", "/x"])
+        self.assertEqual(summary.images, ["/a.png"])
+        self.assertEqual(summary.word_count, 24)
+
+    def test_missing_title(self):
+        _, summary = parse_document("## Only a section")
+        self.assertIsNone(summary.title)
+        with self.assertRaises(ValueError):
+            summary.require_title()
+
+    def test_streaming_matches_tree(self):
+        _, expected = parse_document(SUMMARY_MARKDOWN)
+        summary = DocumentSummary()
+        blocks = iter_markdown_blocks(io.StringIO(SUMMARY_MARKDOWN))
+        "".join(iter_markdown_html(blocks, summary=summary))
+        self.assertEqual(summary, expected)
+
+    def test_terms(self):
+        _, summary = parse_document(SUMMARY_MARKDOWN, summary=DocumentSummary(terms={}))
+        self.assertEqual(summary.terms["docs"], 1)
+        self.assertEqual(summary.terms["code"], 1)
+        self.assertEqual(summary.terms["one"], 1)
+        self.assertNotIn("alt", summary.terms)
+        self.assertNotIn("a", summary.terms)
+        self.assertEqual(sum(summary.terms.values()), 18)
+
+    def test_json_round_trip(self):
+        _, summary = parse_document(SUMMARY_MARKDOWN)
+        self.assertEqual(DocumentSummary.from_json(summary.to_json()), summary)
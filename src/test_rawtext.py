@@ -7,6 +7,14 @@ from inline_markdown import (
     split_nodes_link,
     extract_markdown_images,
     extract_markdown_links,
+    disable_inline_cache,
+    enable_inline_cache,
+    get_inline_engine,
+    inline_cache_info,
+    merge_inline_cache_info,
+    set_inline_engine,
+    text_to_textnodes_multi_pass,
+    tokenize_inline,
 )
 from textnode import TextNode, TextType
 
@@ -387,5 +395,102 @@ class TestRawTextLinkMarkdownExtraction(unittest.TestCase):
         self.assertEqual([], link_content)
 
 
+class TestSinglePassInlineEngine(unittest.TestCase):
+    cases = [
+        "",
+        "plain text with no markup",
+        "This is **text** with an _italic_ word and a `code block` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)",
+        "**bold** at the start and __also bold__ at the end",
+        "*star italic* and _underscore italic_ and `code with * and _ inside`",
+        "a **** empty bold and `` empty code",
+        "**a link [inside](/bold) stays raw**",
+        "![image](/a.png)![second](/b.png)[link](/c)",
+        "broken ![image(/a.png) and [link](/c",
+        "text with a rick roll](https://i.imgur.com/aKaOqIh.gif)!",
+        "![](empty alt) and [](empty text)",
+        "!![image](/a.png)",
+        "snake_case_word",
+    ]
+
+    def tearDown(self):
+        set_inline_engine("multi-pass")
+
+    def test_matches_multi_pass_engine(self):
+        for text in self.cases:
+            with self.subTest(text=text):
+                self.assertEqual(tokenize_inline(text), text_to_textnodes_multi_pass(text))
+
+    def test_missing_closing_delimiter(self):
+        for text in ("an **unclosed bold", "a `stray backtick", "one _underscore"):
+            with self.subTest(text=text):
+                with self.assertRaises(Exception):
+                    tokenize_inline(text)
+
+    def test_engine_selection(self):
+        set_inline_engine("single-pass")
+        self.assertEqual(get_inline_engine(), "single-pass")
+        self.assertEqual(
+            text_to_textnodes("a `b` c"),
+            [TextNode("a ", TextType.TEXT), TextNode("b", TextType.CODE), TextNode(" c", TextType.TEXT)],
+        )
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            set_inline_engine("regex")
+
+
+class TestInlineCache(unittest.TestCase):
+    text = "A shared **disclaimer** with a [link](/legal)"
+
+    def setUp(self):
+        enable_inline_cache(maxsize=2)
+
+    def tearDown(self):
+        disable_inline_cache()
+        set_inline_engine("multi-pass")
+
+    def test_repeated_text_hits_cache(self):
+        first = text_to_textnodes(self.text)
+        second = text_to_textnodes(self.text)
+        self.assertEqual(first, second)
+        self.assertEqual(first, text_to_textnodes_multi_pass(self.text))
+        info = inline_cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_results_are_copies(self):
+        first = text_to_textnodes(self.text)
+        first[1].text = "changed"
+        first.append(TextNode("extra", TextType.TEXT))
+        second = text_to_textnodes(self.text)
+        self.assertEqual(second[1].text, "disclaimer")
+        self.assertEqual(len(second), 4)
+        self.assertIsNot(first[0], second[0])
+
+    def test_cache_is_size_bounded(self):
+        for text in ("one", "two", "three"):
+            text_to_textnodes(text)
+        self.assertEqual(inline_cache_info().currsize, 2)
+
+    def test_engine_is_part_of_the_key(self):
+        text_to_textnodes(self.text)
+        set_inline_engine("single-pass")
+        text_to_textnodes(self.text)
+        self.assertEqual(inline_cache_info().misses, 2)
+
+    def test_info_includes_workers(self):
+        text_to_textnodes(self.text)
+        merge_inline_cache_info(101, 5, 2, 2)
+        merge_inline_cache_info(102, 1, 1, 1)
+        merge_inline_cache_info(101, 6, 2, 2)
+        info = inline_cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (7, 4, 4))
+        enable_inline_cache(maxsize=2)
+        self.assertEqual(inline_cache_info().hits, 0)
+
+    def test_disabled_cache_has_no_info(self):
+        disable_inline_cache()
+        self.assertIsNone(inline_cache_info())
+
+
 if __name__ == "__main__":
     unittest.main()
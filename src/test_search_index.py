@@ -0,0 +1,122 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from search_index import SearchIndex, decode_postings, encode_postings, shard_name
+
+
+class TestPostings(unittest.TestCase):
+    def test_delta_round_trip(self):
+        postings = [(0, 3), (4, 1), (5, 2), (40, 1)]
+        self.assertEqual(encode_postings(postings), [0, 3, 4, 1, 1, 2, 35, 1])
+        self.assertEqual(decode_postings(encode_postings(postings)), postings)
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("tolkien"), "to")
+        self.assertEqual(shard_name("42"), "42")
+        self.assertEqual(shard_name("élan"), "_c3a96c")
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.docs = self.root / "docs"
+        self.store = self.root / "search"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read(self, name):
+        return json.loads((self.docs / "search" / f"{name}.json").read_text())
+
+    def build(self):
+        index = SearchIndex(self.store)
+        index.update("a.md", "h1", "/a/", "A", {"tolkien": 2, "elves": 1})
+        index.update("b.md", "h2", "/b/", "B", {"tolkien": 1, "hobbits": 3})
+        outputs, written = index.write(self.docs)
+        index.save()
+        return outputs, written
+
+    def test_write(self):
+        outputs, written = self.build()
+        self.assertEqual(written, 3)
+        self.assertEqual(outputs, {"search/index.json", "search/to.json", "search/el.json", "search/ho.json"})
+        self.assertEqual(self.read("index")["pages"], [["/a/", "A"], ["/b/", "B"]])
+        shard = self.read("to")
+        self.assertEqual(shard["terms"], ["tolkien"])
+        self.assertEqual(decode_postings(shard["postings"][0]), [(0, 2), (1, 1)])
+
+    def test_only_changed_shards_are_written(self):
+        self.build()
+        before = (self.docs / "search" / "to.json").stat().st_mtime_ns
+        index = SearchIndex(self.store)
+        self.assertTrue(index.load())
+        self.assertTrue(index.is_current("a.md", "h1"))
+        index.update("b.md", "h3", "/b/", "B", {"tolkien": 1, "hobbits": 4})
+        _, written = index.write(self.docs)
+        self.assertEqual(written, 1)
+        self.assertEqual((self.docs / "search" / "to.json").stat().st_mtime_ns, before)
+        self.assertEqual(decode_postings(self.read("ho")["postings"][0]), [(1, 4)])
+
+    def test_removed_page_frees_its_id(self):
+        self.build()
+        index = SearchIndex(self.store)
+        index.load()
+        index.prune(["b.md"])
+        outputs, _ = index.write(self.docs)
+        self.assertNotIn("search/el.json", outputs)
+        self.assertFalse((self.docs / "search" / "el.json").exists())
+        self.assertEqual(self.read("index")["pages"], [None, ["/b/", "B"]])
+        index.update("c.md", "h4", "/c/", "C", {"elves": 1})
+        index.write(self.docs)
+        self.assertEqual(self.read("index")["pages"][0], ["/c/", "C"])
+
+    def test_missing_shards_are_rewritten(self):
+        self.build()
+        (self.docs / "search" / "to.json").unlink()
+        index = SearchIndex(self.store)
+        index.load()
+        _, written = index.write(self.docs)
+        self.assertEqual(written, 1)
+        self.assertTrue((self.docs / "search" / "to.json").exists())
+
+    def test_store_round_trip(self):
+        self.build()
+        index = SearchIndex(self.store)
+        self.assertTrue(index.load())
+        self.assertEqual(index.pages["b.md"], {"id": 1, "source": "h2", "url": "/b/", "title": "B"})
+        self.assertEqual(index.block_terms(0)[0], {"tolkien": 2, "elves": 1})
+
+    @mock.patch("search_index.PAGE_BLOCK", 1)
+    def test_only_changed_blocks_and_shards_are_stored(self):
+        self.build()
+        # Stored files are replaced, never written in place.
+        stored = {path: path.stat().st_ino for path in self.store.rglob("*.json")}
+        index = SearchIndex(self.store)
+        index.load()
+        index.update("b.md", "h3", "/b/", "B", {"tolkien": 1, "hobbits": 4})
+        index.write(self.docs)
+        index.save()
+        # Term counts are only read for the block of the changed page.
+        self.assertEqual(set(index.term_blocks), {1})
+        rewritten = {
+            path.relative_to(self.store).as_posix()
+            for path, inode in stored.items()
+            if path.stat().st_ino != inode
+        }
+        self.assertEqual(rewritten, {"pages/1.json", "terms/1.json", "shards/ho.json"})
+
+    def test_store_in_another_format_is_dropped(self):
+        self.build()
+        (self.store / "store.json").write_text('{"format": 1}')
+        index = SearchIndex(self.store)
+        self.assertFalse(index.load())
+        self.assertFalse(self.store.exists())
+        self.assertEqual(index.pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
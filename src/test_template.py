@@ -0,0 +1,111 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+
+from template import Template, TemplateCache, rewrite_root_urls
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(
+            template.render(Title="Home", Content="<p>hi</p>"),
+            "<title>Home</title><main><p>hi</p></main>",
+        )
+
+    def test_segments_and_slots(self):
+        template = Template("a{{ Title }}b{{ Content }}c")
+        self.assertEqual(template.segments, ["a", "b", "c"])
+        self.assertEqual([name for name, _ in template.slots], ["Title", "Content"])
+
+    def test_unknown_slot_is_left_in_place(self):
+        template = Template("{{ Title }} {{ Footer }}")
+        self.assertEqual(template.render(Title="Home"), "Home {{ Footer }}")
+
+    def test_base_path_applied_to_template_only(self):
+        # Slot values resolve their own URLs when they are rendered.
+        template = Template('<link href="/index.css">{{ Content }}', "/site/")
+        self.assertEqual(template.segments[0], '<link href="/site/index.css">')
+        self.assertEqual(
+            template.render(Content='<code>src="/a.png"</code>'),
+            '<link href="/site/index.css"><code>src="/a.png"</code>',
+        )
+
+    def test_iterable_slot_values(self):
+        template = Template("<main>{{ Content }}</main>", "/site/")
+        fragments = ["<a ", 'href="/site/x">', "x</a>"]
+        self.assertEqual(
+            list(template.iter_render(Content=iter(fragments))),
+            ["<main>", "<a ", 'href="/site/x">', "x</a>", "</main>"],
+        )
+
+    def test_write(self):
+        template = Template("<title>{{ Title }}</title>")
+        stream = io.StringIO()
+        template.write(stream, Title="Home")
+        self.assertEqual(stream.getvalue(), "<title>Home</title>")
+
+    def test_root_base_path_is_untouched(self):
+        html = '<a href="/x">'
+        self.assertIs(rewrite_root_urls(html, "/"), html)
+
+
+class TestTemplateCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_cache_reuses_compiled_template(self):
+        path = self.root / "template.html"
+        path.write_text("{{ Content }}")
+        cache = TemplateCache()
+        self.assertIs(cache.get(path), cache.get(path))
+
+    def test_cache_reloads_on_change(self):
+        path = self.root / "template.html"
+        path.write_text("{{ Content }}")
+        cache = TemplateCache()
+        first = cache.get(path)
+        path.write_text("<b>{{ Content }}</b>")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertIsNot(cache.get(path), first)
+        self.assertEqual(cache.get(path).render(Content="x"), "<b>x</b>")
+
+    def test_find_layout_uses_nearest_section_template(self):
+        content = self.root / "content"
+        (content / "blog" / "post").mkdir(parents=True)
+        (content / "about").mkdir()
+        (content / "blog" / "template.html").write_text("blog")
+        default = self.root / "template.html"
+        cache = TemplateCache()
+        self.assertEqual(
+            cache.find_layout(content / "blog" / "post" / "index.md", content, default),
+            content / "blog" / "template.html",
+        )
+        self.assertEqual(cache.find_layout(content / "about" / "index.md", content, default), default)
+        self.assertEqual(cache.find_layout(content / "index.md", content, default), default)
+
+    def test_find_layout_checks_each_directory_once(self):
+        content = self.root / "content"
+        (content / "blog").mkdir(parents=True)
+        (content / "blog" / "template.html").write_text("blog")
+        (content / "contents").mkdir()
+        default = self.root / "template.html"
+        cache = TemplateCache()
+        with mock.patch("os.path.isfile", wraps=os.path.isfile) as isfile:
+            for name in ("a.md", "b.md", "c.md"):
+                self.assertEqual(cache.find_layout(str(content / "blog" / name), str(content), default), content / "blog" / "template.html")
+        self.assertEqual(isfile.call_count, 1)
+        # Only directories under the content root itself are searched.
+        self.assertEqual(cache.find_layout(content / "contents" / "index.md", content / "cont", default), default)
+
+
+if __name__ == "__main__":
+    unittest.main()
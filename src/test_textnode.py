@@ -27,6 +27,10 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("This is a text node", TextType.BOLD)
         self.assertIsInstance(node.text_type, TextType)
 
+    def test_text_node_is_slotted(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+
     def test_text_type_value(self):
         node = TextNode("This is a text node", TextType.BOLD)
         self.assertEqual(node.text_type.value, "bold")
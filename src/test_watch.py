@@ -0,0 +1,150 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from watch import InotifyWatcher, diff_snapshots, load_inotify, snapshot, watch
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        (self.root / "content" / "blog").mkdir(parents=True)
+        (self.root / "content" / "index.md").write_text("# Home")
+        (self.root / "content" / "blog" / "index.md").write_text("# Blog")
+        (self.root / "template.html").write_text("{{ Content }}")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def paths(self):
+        return [self.root / "content", self.root / "template.html", self.root / "missing"]
+
+    def test_snapshot_lists_files_and_single_paths(self):
+        self.assertEqual(
+            set(snapshot(self.paths())),
+            {
+                self.root / "content" / "index.md",
+                self.root / "content" / "blog" / "index.md",
+                self.root / "template.html",
+            },
+        )
+
+    def test_dangling_symlink_does_not_hide_its_siblings(self):
+        content = self.root / "content"
+        (content / "a.md").write_text("# A")
+        os.symlink(self.root / "nowhere.md", content / "m.md")
+        (content / "z.md").write_text("# Z")
+        files = set(snapshot([content]))
+        self.assertIn(content / "a.md", files)
+        self.assertIn(content / "z.md", files)
+        self.assertNotIn(content / "m.md", files)
+
+    def test_vanished_entry_does_not_hide_its_siblings(self):
+        content = self.root / "content"
+        (content / "a.md").write_text("# A")
+        (content / "z.md").write_text("# Z")
+        real_scandir = os.scandir
+
+        def scandir(path):
+            entries = list(real_scandir(path))
+            for entry in entries:
+                if entry.name == "index.md":
+                    os.unlink(entry.path)
+            return iter(entries)
+
+        with mock.patch("watch.os.scandir", scandir):
+            files = set(snapshot([content]))
+        self.assertEqual(files, {content / "a.md", content / "z.md"})
+
+    def test_diff_reports_changes_additions_and_removals(self):
+        before = snapshot(self.paths())
+        path = self.root / "content" / "index.md"
+        path.write_text("# Home page")
+        (self.root / "content" / "new.md").write_text("# New")
+        os.unlink(self.root / "content" / "blog" / "index.md")
+        changed, removed = diff_snapshots(before, snapshot(self.paths()))
+        self.assertEqual(changed, {path, self.root / "content" / "new.md"})
+        self.assertEqual(removed, {self.root / "content" / "blog" / "index.md"})
+
+    def test_no_changes(self):
+        before = snapshot(self.paths())
+        self.assertEqual(diff_snapshots(before, snapshot(self.paths())), (set(), set()))
+
+
+@unittest.skipIf(load_inotify() is None, "inotify is not available")
+class TestInotifyWatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.content = self.root / "content"
+        (self.content / "blog" / "post").mkdir(parents=True)
+        (self.content / "index.md").write_text("# Home")
+        (self.content / "blog" / "post" / "index.md").write_text("# Post")
+        (self.root / "template.html").write_text("{{ Content }}")
+        (self.root / "notes.txt").write_text("not watched")
+        self.paths = [self.content, self.root / "template.html"]
+        self.watcher = InotifyWatcher.open(self.paths)
+        self.addCleanup(self.watcher.close)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def wait(self):
+        changes = self.watcher.wait(1)
+        # The watcher's own snapshot must match a full listing.
+        self.assertEqual(self.watcher.files, snapshot(self.paths))
+        return changes
+
+    def test_starts_from_a_full_snapshot(self):
+        self.assertEqual(self.watcher.files, snapshot(self.paths))
+
+    def test_reports_changed_added_and_removed_files(self):
+        (self.content / "index.md").write_text("# Home page")
+        (self.content / "blog" / "new.md").write_text("# New")
+        os.unlink(self.content / "blog" / "post" / "index.md")
+        changed, removed = self.wait()
+        self.assertEqual(changed, {self.content / "index.md", self.content / "blog" / "new.md"})
+        self.assertEqual(removed, {self.content / "blog" / "post" / "index.md"})
+
+    def test_new_directories_are_watched(self):
+        (self.content / "docs").mkdir()
+        (self.content / "docs" / "index.md").write_text("# Docs")
+        self.assertEqual(self.wait(), ({self.content / "docs" / "index.md"}, set()))
+        (self.content / "docs" / "index.md").write_text("# Docs page")
+        self.assertEqual(self.wait(), ({self.content / "docs" / "index.md"}, set()))
+
+    def test_moved_and_removed_directories(self):
+        os.rename(self.content / "blog", self.content / "journal")
+        changed, removed = self.wait()
+        self.assertEqual(changed, {self.content / "journal" / "post" / "index.md"})
+        self.assertEqual(removed, {self.content / "blog" / "post" / "index.md"})
+        shutil.rmtree(self.content / "journal")
+        self.assertEqual(self.wait(), (set(), {self.content / "journal" / "post" / "index.md"}))
+
+    def test_single_file_is_watched_through_its_directory(self):
+        (self.root / "notes.txt").write_text("still not watched")
+        self.assertEqual(self.watcher.wait(0.05), (set(), set()))
+        replacement = self.root / "template.tmp"
+        replacement.write_text("<main>{{ Content }}</main>")
+        os.replace(replacement, self.root / "template.html")
+        self.assertEqual(self.wait(), ({self.root / "template.html"}, set()))
+
+    def test_watch_uses_inotify(self):
+        changes = []
+
+        def should_stop():
+            if not changes:
+                (self.content / "index.md").write_text("# Changed")
+            return bool(changes)
+
+        with mock.patch("watch.snapshot", side_effect=AssertionError("polled")):
+            watch(self.paths, lambda changed, removed: changes.append((changed, removed)), 0.05, should_stop)
+        self.assertEqual(changes, [({self.content / "index.md"}, set())])
+
+
+if __name__ == "__main__":
+    unittest.main()
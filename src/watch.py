@@ -0,0 +1,267 @@
+import errno, os, select, struct, time
+from pathlib import Path
+
+# inotify(7) flags, from <sys/inotify.h>.
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def file_state(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def scan_tree(root, files, on_directory=None):
+    # An entry that was deleted between listing and stat, or a symlink whose
+    # target is missing, is left out on its own; the rest of its directory
+    # is still listed. on_directory(path) is called before each directory
+    # is listed.
+    pending = [root]
+    while pending:
+        path = pending.pop()
+        try:
+            if on_directory is not None:
+                on_directory(path)
+            entries = list(os.scandir(path))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(entry.path)
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+
+
+def snapshot(paths):
+    files = {}
+    for path in paths:
+        path = str(path)
+        if os.path.isdir(path):
+            scan_tree(path, files)
+            continue
+        try:
+            files[Path(path)] = file_state(path)
+        except FileNotFoundError:
+            continue
+    return files
+
+
+def diff_snapshots(old, new):
+    changed = {path for path, state in new.items() if old.get(path) != state}
+    removed = {path for path in old if path not in new}
+    return changed, removed
+
+
+def load_inotify():
+    # Linux only; elsewhere watch() falls back to polling.
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch, ctypes.get_errno
+    except (ImportError, OSError, AttributeError):
+        return None
+
+
+class InotifyWatcher:
+    # Keeps a snapshot of the watched paths up to date from inotify events,
+    # so that a poll only looks at the entries the kernel reported instead
+    # of listing and statting every file. A single file is watched through
+    # its parent directory, since editors often replace files by renaming.
+    def __init__(self, paths, functions):
+        self.init, self.add_watch, self.remove_watch, self.get_errno = functions
+        self.paths = [os.path.normpath(path) for path in paths]
+        self.fd = self.init(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise self.error("inotify_init1")
+        try:
+            self.files = self.start()
+        except BaseException:
+            self.close()
+            raise
+
+    @classmethod
+    def open(cls, paths):
+        functions = load_inotify()
+        if functions is None:
+            return None
+        try:
+            return cls(paths, functions)
+        except OSError as error:
+            # Most likely fs.inotify.max_user_watches is too low for the tree.
+            print(f"inotify is unavailable ({error}); polling for changes instead.")
+            return None
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def error(self, call, path=None):
+        number = self.get_errno()
+        if path is not None and number in (errno.ENOENT, errno.ENOTDIR):
+            return FileNotFoundError(number, os.strerror(number), path)
+        return OSError(number, f"{call}: {os.strerror(number)}", path)
+
+    def start(self):
+        # Watches are added before each directory is listed, so nothing
+        # created in between is missed.
+        self.directories = {}
+        self.watches = {}
+        self.tree_watches = set()
+        self.single_files = {}
+        files = {}
+        for path in self.paths:
+            if os.path.isdir(path):
+                scan_tree(path, files, self.watch_directory)
+                continue
+            parent = os.path.dirname(path) or os.curdir
+            self.watch_directory(parent, tree=False)
+            self.single_files.setdefault(parent, set()).add(os.path.basename(path))
+            try:
+                files[Path(path)] = file_state(path)
+            except FileNotFoundError:
+                pass
+        return files
+
+    def watch_directory(self, path, tree=True):
+        watch = self.add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if watch < 0:
+            raise self.error("inotify_add_watch", path)
+        self.directories[watch] = path
+        self.watches[path] = watch
+        if tree:
+            self.tree_watches.add(watch)
+
+    def unwatch_directory(self, path):
+        watch = self.watches.pop(path)
+        if watch is not None:
+            self.remove_watch(self.fd, watch)
+            del self.directories[watch]
+            self.tree_watches.discard(watch)
+
+    def read_events(self):
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                watch, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                events.append((watch, mask, name))
+
+    def wait(self, timeout):
+        # Returns (changed, removed), like diff_snapshots, for the events
+        # that arrive before the timeout.
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set(), set()
+        touched = set()
+        overflow = False
+        for watch, mask, name in self.read_events():
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            directory = self.directories.get(watch)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # The directory itself is gone. Its path stays known until
+                # the event from its parent drops the files under it.
+                del self.directories[watch]
+                self.watches[directory] = None
+                self.tree_watches.discard(watch)
+                continue
+            if watch in self.tree_watches or name in self.single_files.get(directory, ()):
+                touched.add(os.path.join(directory, name))
+
+        if overflow:
+            # The kernel dropped events: start over from a full listing.
+            for path in list(self.watches):
+                self.unwatch_directory(path)
+            old, self.files = self.files, self.start()
+            return diff_snapshots(old, self.files)
+
+        old = {}
+        for path in sorted(touched):
+            self.refresh(path, old)
+        changed = {path for path, state in old.items() if path in self.files and self.files[path] != state}
+        removed = {path for path, state in old.items() if state is not None and path not in self.files}
+        return changed, removed
+
+    def refresh(self, path, old):
+        # old collects the state each touched file had before the event,
+        # None for a file that is new.
+        if path in self.watches:
+            # A directory that was moved, removed or replaced: forget
+            # everything under it before listing it again.
+            prefix = path + os.sep
+            for directory in [directory for directory in self.watches if directory.startswith(prefix)]:
+                self.unwatch_directory(directory)
+            self.unwatch_directory(path)
+            for file_path in [file_path for file_path in self.files if str(file_path).startswith(prefix)]:
+                old.setdefault(file_path, self.files.pop(file_path))
+        if os.path.isdir(path) and not os.path.islink(path):
+            listed = {}
+            scan_tree(path, listed, self.watch_directory)
+            for file_path, state in listed.items():
+                old.setdefault(file_path, None)
+                self.files[file_path] = state
+            return
+
+        file_path = Path(path)
+        old.setdefault(file_path, self.files.get(file_path))
+        try:
+            self.files[file_path] = file_state(path)
+        except (FileNotFoundError, NotADirectoryError):
+            self.files.pop(file_path, None)
+
+
+def watch(paths, on_change, interval=0.1, should_stop=None):
+    # Uses inotify where the platform has it, and otherwise polls every
+    # interval seconds, comparing full snapshots.
+    watcher = InotifyWatcher.open(paths)
+    if watcher is not None:
+        with watcher:
+            while should_stop is None or not should_stop():
+                changed, removed = watcher.wait(interval)
+                if changed or removed:
+                    on_change(changed, removed)
+        return
+
+    previous = snapshot(paths)
+    while should_stop is None or not should_stop():
+        time.sleep(interval)
+        current = snapshot(paths)
+        changed, removed = diff_snapshots(previous, current)
+        if changed or removed:
+            on_change(changed, removed)
+        previous = current